@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class TaskManagerConfig(AppConfig):
+    name = 'task_manager'
+
+    def ready(self):
+        from .error_reporting import install
+        from .instrumentation import install_query_wrapper
+        install()
+        connection_created.connect(install_query_wrapper)
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'task_manager.settings')
+# Под ASGI список и карточка задач работают на async ORM
+os.environ.setdefault('ROOT_URLCONF', 'task_manager.asgi_urls')
 
 application = get_asgi_application()
@@ -0,0 +1,18 @@
+"""
+URL configuration served by task_manager.asgi.
+
+The same as task_manager.urls, except that the task list and detail are
+native async views.
+"""
+from django.urls import include, path
+
+from . import urls
+
+urlpatterns = [
+    path(
+        'tasks/',
+        include(('task_manager.tasks.async_urls', 'tasks'), namespace='tasks')
+    )
+    if getattr(pattern, 'namespace', None) == 'tasks' else pattern
+    for pattern in urls.urlpatterns
+]
@@ -0,0 +1,91 @@
+import statistics
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.urls import URLResolver, get_resolver
+
+from task_manager.users.models import User
+
+# Разница меньше этой считается шумом, даже если в процентах она велика
+LATENCY_SLACK_MS = 1
+MEMORY_SLACK_KIB = 16
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(values, n=100, method="inclusive")[
+        percent - 1]
+
+
+def testserver_settings(**overrides):
+    """
+    override_settings for a benchmark through the test client, which sends
+    requests to the host "testserver".
+    """
+    return override_settings(
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"], **overrides)
+
+
+@contextmanager
+def benchmark_user(**kwargs):
+    """A new user to measure with, deleted after the block."""
+    user = User.objects.create_user(
+        username=f"benchmark-{uuid.uuid4().hex[:8]}", **kwargs)
+    try:
+        yield user
+    finally:
+        user.delete()
+
+
+def iter_views(urlconf=None, skip_namespaces=("admin",)):
+    """
+    Yield ``(view_name, url_arguments)`` of every named URL of the urlconf,
+    e.g. ``("tasks:tasks_detail", ["pk"])``.
+    """
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.namespace in skip_namespaces:
+                    continue
+                yield from walk(
+                    pattern.url_patterns,
+                    ":".join(filter(None, [namespace, pattern.namespace])),
+                )
+            elif pattern.name:
+                name = (
+                    f"{namespace}:{pattern.name}" if namespace
+                    else pattern.name
+                )
+                yield name, list(pattern.pattern.converters)
+
+    return walk(get_resolver(urlconf).url_patterns, "")
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compare benchmark results with a baseline of the same format.
+
+    Median latency and memory may grow by ``threshold`` percent; the query
+    count, which does not depend on the machine, may not grow at all.
+    Views missing from the baseline are skipped.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["queries"] > base["queries"]:
+            regressions.append(
+                f"{name}: queries {base['queries']} -> {result['queries']}")
+        for key, slack in (
+            ("p50_ms", LATENCY_SLACK_MS),
+            ("memory_kib", MEMORY_SLACK_KIB),
+        ):
+            limit = max(base[key] * (1 + threshold / 100), base[key] + slack)
+            if result[key] > limit:
+                regressions.append(
+                    f"{name}: {key} {base[key]} -> {result[key]}")
+    return regressions
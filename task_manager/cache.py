@@ -0,0 +1,114 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+
+def _version_key(namespace):
+    return f"version:{namespace}"
+
+
+def _new_version():
+    # Версия, созданная заново после вытеснения из кэша, не должна
+    # совпасть со старой, иначе всплывут устаревшие записи.
+    return time.time_ns()
+
+
+def get_versions(*namespaces):
+    """Return the current version of every namespace, in the given order."""
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() не затрёт версию, которую успел создать другой процесс
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(*namespaces):
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _new_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def get_version(namespace):
+    return get_versions(namespace)[0]
+
+
+def _changed_key(namespace):
+    return f"changed:{namespace}"
+
+
+def bump_version(namespace):
+    """Invalidate every cache entry built with the namespace's version."""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+    cache.set(
+        _changed_key(namespace), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def changed_recently(*namespaces):
+    """
+    Whether a namespace's version was bumped within the last
+    DATABASE_REPLICA_PIN_SECONDS, so a replica may not have the change yet.
+    """
+    return bool(cache.get_many([_changed_key(name) for name in namespaces]))
+
+
+def model_namespace(model):
+    return model._meta.label_lower
+
+
+def cached_choices(queryset, choice, key):
+    """
+    Return ``[choice(obj) for obj in queryset]``, cached until a row of
+    the queryset's model is saved or deleted.
+    """
+    namespace = model_namespace(queryset.model)
+    cache_key = f"choices:{namespace}:{get_version(namespace)}:{key}"
+    choices = cache.get(cache_key)
+    if choices is None:
+        choices = [choice(obj) for obj in queryset]
+        cache.set(cache_key, choices, settings.CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
+async def acached_choices(queryset, choice, key):
+    namespace = model_namespace(queryset.model)
+    version, = await aget_versions(namespace)
+    cache_key = f"choices:{namespace}:{version}:{key}"
+    choices = await cache.aget(cache_key)
+    if choices is None:
+        choices = [choice(obj) async for obj in queryset.aiterator()]
+        await cache.aset(cache_key, choices, settings.CHOICES_CACHE_TIMEOUT)
+    return choices
+
+
+def cached_fragments(objects, key, render):
+    """
+    Return ``[render(obj) for obj in objects]`` as safe HTML.
+
+    ``key(obj)`` must change whenever the rendered fragment would. All
+    fragments are read with one multi-get and only the missing ones are
+    rendered and stored.
+    """
+    keys = [f"fragment:{key(obj)}" for obj in objects]
+    fragments = cache.get_many(keys)
+    missing = {
+        cache_key: render(obj)
+        for cache_key, obj in zip(keys, objects)
+        if cache_key not in fragments
+    }
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+        fragments.update(missing)
+    return [mark_safe(fragments[cache_key]) for cache_key in keys]
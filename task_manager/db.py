@@ -0,0 +1,36 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """
+    Return usage of the connection pool of this process, or None when the
+    database is not pooled (SQLite, or DATABASE_POOL=false).
+
+    Counters grow from the start of the process. Only checkouts that found
+    no free connection wait, so the average wait is over those.
+    """
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    queued = stats.get("requests_queued", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "size": stats.get("pool_size", 0),
+        "available": stats.get("pool_available", 0),
+        "min_size": stats.get("pool_min", 0),
+        "max_size": stats.get("pool_max", 0),
+        "checkouts": stats.get("requests_num", 0),
+        "waiting": stats.get("requests_waiting", 0),
+        "queued": queued,
+        "wait_ms": wait_ms,
+        "avg_wait_ms": round(wait_ms / queued, 1) if queued else 0,
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+        "bad_returns": stats.get("returns_bad", 0),
+    }
+
+
+def check_database(alias=DEFAULT_DB_ALIAS):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
@@ -0,0 +1,224 @@
+import json
+import queue
+import threading
+import time
+from urllib.parse import urljoin
+
+import requests
+import rollbar
+from django.conf import settings
+from rollbar.lib import defaultJSONEncode, events
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Stop calling an endpoint that keeps failing.
+
+    After ``failures`` failed calls in a row the breaker opens and refuses
+    calls for ``cooldown`` seconds. Then one trial call is let through:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failures, cooldown, clock=time.monotonic):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.failed = 0
+        self.opened_at = None
+
+    def allow(self):
+        if self.state == OPEN:
+            if self.clock() - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+        return True
+
+    def record(self, ok):
+        if ok:
+            self.state = CLOSED
+            self.failed = 0
+            return
+        self.failed += 1
+        if self.state == HALF_OPEN or self.failed >= self.failures:
+            self.state = OPEN
+            self.opened_at = self.clock()
+
+
+class ReportQueue:
+    """
+    Send Rollbar items from a background thread.
+
+    Request threads only put payloads into a bounded queue; when it is full
+    the payload is dropped. The sender takes up to ``batch_size`` payloads,
+    waiting at most ``batch_wait`` seconds for more after the first, and
+    posts them over one keep-alive connection. A send that fails or takes
+    longer than ``slow_seconds`` counts against the circuit breaker; while
+    it is open payloads are dropped without a request.
+    """
+
+    def __init__(self, endpoint, maxsize=1000, batch_size=20, batch_wait=1.0,
+                 timeout=3.0, slow_seconds=1.0, failures=3, cooldown=30.0):
+        self.url = urljoin(endpoint, "item/")
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.slow_seconds = slow_seconds
+        self.breaker = CircuitBreaker(failures, cooldown)
+        self.queue = queue.Queue(maxsize)
+        self.session = requests.Session()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, payload, access_token):
+        self.start()
+        try:
+            self.queue.put_nowait((payload, access_token))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="rollbar-sender", daemon=True)
+                self.thread.start()
+
+    def stop(self, timeout=None):
+        """Send what is queued and stop the sender."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+            self.thread = None
+        self.session.close()
+
+    def flush(self, timeout=None):
+        """Wait until every queued payload is sent or dropped."""
+        with self.queue.all_tasks_done:
+            return self.queue.all_tasks_done.wait_for(
+                lambda: not self.queue.unfinished_tasks, timeout)
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                self.send_batch(item for item in batch if item is not None)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.batch_wait
+        while batch[-1] is not None and len(batch) < self.batch_size:
+            try:
+                batch.append(
+                    self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def send_batch(self, batch):
+        for payload, access_token in batch:
+            if not self.breaker.allow():
+                with self.lock:
+                    self.dropped += 1
+                continue
+            ok = self.send(payload, access_token)
+            self.breaker.record(ok)
+            with self.lock:
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+
+    def send(self, payload, access_token):
+        start = time.monotonic()
+        try:
+            response = self.session.post(
+                self.url,
+                data=json.dumps(payload, default=defaultJSONEncode),
+                headers={
+                    "Content-Type": "application/json",
+                    "X-Rollbar-Access-Token": access_token,
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException:
+            return False
+        # 429 и 5xx - перегрузка на стороне Rollbar, отложим отправку
+        return (
+            response.status_code != 429
+            and response.status_code < 500
+            and time.monotonic() - start <= self.slow_seconds
+        )
+
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "circuit": self.breaker.state,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """The report queue of this process, created on first use."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReportQueue(
+                rollbar.SETTINGS["endpoint"],
+                maxsize=settings.ERROR_REPORT_QUEUE_SIZE,
+                batch_size=settings.ERROR_REPORT_BATCH_SIZE,
+                batch_wait=settings.ERROR_REPORT_BATCH_WAIT,
+                timeout=settings.ERROR_REPORT_TIMEOUT,
+                slow_seconds=settings.ERROR_REPORT_SLOW_SECONDS,
+                failures=settings.ERROR_REPORT_FAILURES,
+                cooldown=settings.ERROR_REPORT_COOLDOWN,
+            )
+        return _queue
+
+
+def reset_queue():
+    global _queue
+    with _queue_lock:
+        report_queue, _queue = _queue, None
+    if report_queue is not None:
+        report_queue.stop()
+
+
+def enqueue_payload(payload, **kwargs):
+    """
+    Rollbar payload handler: queue the item instead of sending it.
+
+    Returning False stops pyrollbar from sending the payload itself.
+    """
+    access_token = payload.get("access_token")
+    if access_token:
+        get_queue().put(payload, access_token)
+    return False
+
+
+def install():
+    # Повторный вызов не должен добавлять обработчик второй раз
+    events.remove_payload_handler(enqueue_payload)
+    events.add_payload_handler(enqueue_payload)
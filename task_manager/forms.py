@@ -1,6 +1,7 @@
 from django import forms
-from django.contrib.auth import get_user_model
+from django.contrib.auth import aauthenticate, get_user_model
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
@@ -25,3 +26,35 @@ class UserLoginForm(AuthenticationForm):
     }
 
     login_url = 'login'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.async_authentication = False
+
+    def clean(self):
+        # В async-режиме пароль проверяет ais_valid(), а не clean()
+        if self.async_authentication:
+            return self.cleaned_data
+        return super().clean()
+
+    async def ais_valid(self):
+        """
+        Async is_valid(): authenticates with aauthenticate(), so the
+        password hasher does not block the event loop.
+        """
+        self.async_authentication = True
+        if not self.is_valid():
+            return False
+        self.user_cache = await aauthenticate(
+            self.request,
+            username=self.cleaned_data["username"],
+            password=self.cleaned_data["password"],
+        )
+        try:
+            if self.user_cache is None:
+                raise self.get_invalid_login_error()
+            self.confirm_login_allowed(self.user_cache)
+        except ValidationError as error:
+            self.add_error(None, error)
+            return False
+        return True
@@ -0,0 +1,470 @@
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.models import QuerySet
+from django.template.base import Node, Variable
+from django.template.defaulttags import ForNode
+
+logger = logging.getLogger("task_manager.timing")
+slow_query_logger = logging.getLogger("task_manager.slow_queries")
+nplusone_logger = logging.getLogger("task_manager.nplusone")
+
+_timings = ContextVar("request_timings", default=None)
+_query_counter = ContextVar("query_counter", default=None)
+_lazy_loads = ContextVar("lazy_loads", default=None)
+# Запросы самого EXPLAIN не должны попадать в журнал медленных
+_explaining = ContextVar("explaining", default=False)
+
+PROJECT_DIR = Path(__file__).resolve().parent
+# Сколько кадров стека с кодом проекта записывать для медленного запроса
+STACK_DEPTH = 5
+# EXPLAIN понимает только запросы к данным, не DDL и не PRAGMA
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+
+class RequestTimings:
+    """Time spent by one request, in seconds, and its database queries."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view = None
+        self.view_name = None
+        self.template = None
+        self.view_started = None
+        self.render_started = None
+
+    def metrics(self, total):
+        """Server-Timing entries: name, duration in ms, description."""
+        metrics = [("db", self.db, f"{self.queries} queries")]
+        if self.view is not None:
+            metrics.append(("view", self.view, None))
+        if self.template is not None:
+            metrics.append(("tpl", self.template, None))
+        metrics.append(("total", total, None))
+        return [
+            (name, round(seconds * 1000, 1), description)
+            for name, seconds, description in metrics
+        ]
+
+
+def observe_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection: counts the queries of a request
+    for Server-Timing, query budgets and the N+1 check and reports those
+    slower than SLOW_QUERY_SECONDS.
+    """
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _timings.get()
+        if timings is not None:
+            timings.db += elapsed
+            timings.queries += 1
+        counter = _query_counter.get()
+        if counter is not None:
+            counter.count += 1
+        lazy_loads = _lazy_loads.get()
+        if lazy_loads is not None:
+            location = lazy_load_location()
+            if location is not None:
+                lazy_loads[location] += 1
+        threshold = settings.SLOW_QUERY_SECONDS
+        if threshold and elapsed >= threshold and not _explaining.get():
+            report_slow_query(
+                context["connection"].alias, sql, params, many, elapsed,
+                timings.view_name if timings is not None else None,
+            )
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created receiver, see TaskManagerConfig.ready."""
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+def query_location():
+    """
+    Where the running query comes from: the innermost frames of project
+    code and, when a template is being rendered, the template line.
+    """
+    stack = []
+    template = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = Path(frame.f_code.co_filename)
+        if (path.is_relative_to(PROJECT_DIR) and path != Path(__file__)
+                and len(stack) < STACK_DEPTH):
+            stack.append(
+                f"{path.relative_to(PROJECT_DIR.parent)}:{frame.f_lineno} "
+                f"in {frame.f_code.co_name}"
+            )
+        # type(), а не isinstance: ленивые объекты вычислились бы от
+        # обращения к __class__
+        node = frame.f_locals.get("self")
+        if template is None and issubclass(type(node), Node) and node.origin:
+            template = f"{node.origin.template_name}:{node.token.lineno}"
+        frame = frame.f_back
+    return stack, template
+
+
+def lazy_load_location():
+    """
+    ``(template line, expression, relation)`` when the running query lazily
+    loads a relation of a model instance for a template, e.g.
+    ``("tasks/tasks_row.html:5", "task.status", "Task -> Status")``; None
+    for any other query.
+    """
+    expression = relation = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        # Как и в query_location: только type(), без isinstance
+        obj = frame.f_locals.get("self")
+        obj_type = type(obj)
+        if relation is None and issubclass(obj_type, QuerySet):
+            # Менеджеры связей помечают свои запросы объектом-владельцем
+            instance = obj._hints.get("instance")
+            if instance is not None:
+                relation = (
+                    f"{type(instance).__name__} -> {obj.model.__name__}")
+        elif expression is None and issubclass(obj_type, Variable):
+            # Выражение до того шага, на котором случился запрос:
+            # task.status из task.status.name
+            bit = frame.f_locals.get("bit")
+            lookups = obj.lookups or ()
+            expression = (
+                ".".join(lookups[:lookups.index(bit) + 1])
+                if bit in lookups else obj.var
+            )
+        elif issubclass(obj_type, Node) and obj.origin:
+            if relation is None:
+                return None
+            if expression is None and issubclass(obj_type, ForNode):
+                # Запрос при обходе самой последовательности цикла
+                expression = obj.sequence.token
+            return (
+                f"{obj.origin.template_name}:{obj.token.lineno}",
+                expression,
+                relation,
+            )
+        frame = frame.f_back
+    return None
+
+
+class SlowQueryExplainer:
+    """
+    Log slow queries with their plan to the "task_manager.slow_queries"
+    logger.
+
+    EXPLAIN runs in a background thread with its own connection, so the
+    request that ran the query does not wait for it. On PostgreSQL a
+    SELECT is explained with ANALYZE, that is run once more. When
+    ``backlog`` queries already wait for EXPLAIN, new ones are logged
+    without a plan.
+    """
+
+    def __init__(self, backlog=10):
+        self.backlog = backlog
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="slow-query-explain")
+
+    def report(self, record, alias, sql, params, many):
+        with self.lock:
+            explain = (
+                not many
+                and sql.lstrip().upper().startswith(EXPLAINABLE)
+                and self.pending < self.backlog
+            )
+            if explain:
+                self.pending += 1
+        if not explain:
+            self.write(record)
+            return None
+        return self.executor.submit(self.explain, record, alias, sql, params)
+
+    def explain(self, record, alias, sql, params):
+        token = _explaining.set(True)
+        try:
+            record["plan"] = self.plan(connections[alias], sql, params)
+        except Exception as e:
+            record["plan_error"] = repr(e)
+        finally:
+            _explaining.reset(token)
+            connections[alias].close()
+            with self.lock:
+                self.pending -= 1
+        self.write(record)
+
+    def plan(self, connection, sql, params):
+        options = {}
+        if (connection.vendor == "postgresql"
+                and sql.lstrip()[:6].upper() == "SELECT"):
+            options["analyze"] = True
+        prefix = connection.ops.explain_query_prefix(**options)
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            # PostgreSQL отдаёт план одной колонкой, SQLite - текст последней
+            return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+    def write(self, record):
+        slow_query_logger.warning(
+            json.dumps(record, default=str), extra={"slow_query": record})
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+_explainer = None
+_explainer_lock = threading.Lock()
+
+
+def get_explainer():
+    global _explainer
+    with _explainer_lock:
+        if _explainer is None:
+            _explainer = SlowQueryExplainer(settings.SLOW_QUERY_EXPLAIN_BACKLOG)
+        return _explainer
+
+
+def report_slow_query(alias, sql, params, many, elapsed, view_name):
+    stack, template = query_location()
+    rows = None
+    if many:
+        # Для executemany хватит первого набора параметров и их числа
+        rows = len(params) if hasattr(params, "__len__") else None
+        params = params[0] if rows else None
+    record = {
+        "duration_ms": round(elapsed * 1000, 1),
+        "view": view_name,
+        "database": alias,
+        "sql": sql,
+        "params": params,
+        "rows": rows,
+        "location": stack[0] if stack else None,
+        "stack": stack,
+        "template": template,
+    }
+    return get_explainer().report(record, alias, sql, params, many)
+
+
+class ServerTimingMiddleware:
+    """
+    Report where the time of a request went in the Server-Timing header
+    and a log line of the "task_manager.timing" logger.
+
+    ``view`` is the view itself; ``tpl`` is rendering of its
+    TemplateResponse, which also runs the lazy queries of the template, so
+    part of ``db`` may fall within ``tpl``. ``total`` covers the middleware
+    below this one as well.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Асинхронный обработчик иначе гонял бы эти хуки через
+            # sync_to_async на каждом запросе
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _timings.reset(token)
+        return self.report(request, response, timings)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    def process_template_response(self, request, response):
+        return self.start_render(response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.start_render(response)
+
+    def start_view(self, request):
+        timings = _timings.get()
+        if timings is not None:
+            timings.view_name = request.resolver_match.view_name
+            timings.view_started = time.perf_counter()
+
+    def start_render(self, response):
+        timings = _timings.get()
+        if timings is None or timings.view_started is None:
+            return response
+        timings.render_started = time.perf_counter()
+        timings.view = timings.render_started - timings.view_started
+
+        def rendered(response):
+            timings.template = time.perf_counter() - timings.render_started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        if timings.view is None and timings.view_started is not None:
+            # Ответ без шаблона: всё время после process_view - это view
+            timings.view = time.perf_counter() - timings.view_started
+        metrics = timings.metrics(total)
+        response["Server-Timing"] = ", ".join(
+            f'{name};dur={duration};desc="{description}"' if description
+            else f"{name};dur={duration}"
+            for name, duration, description in metrics
+        )
+        view_name = timings.view_name
+        fields = {f"{name}_ms": duration for name, duration, _ in metrics}
+        fields["queries"] = timings.queries
+        logger.info(
+            "view=%s method=%s status=%s %s",
+            view_name,
+            request.method,
+            response.status_code,
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra={
+                "view_name": view_name,
+                "method": request.method,
+                "status": response.status_code,
+                **fields,
+            },
+        )
+        return response
+
+
+def get_query_budget(view, method="GET"):
+    """
+    Budget of a class-based view function for ``method``, or None.
+    ``max_queries`` is either one budget for every method or a dict of
+    budgets by method, e.g. ``{"GET": 3, "POST": 7}``; HEAD shares the
+    budget of GET.
+    """
+    budget = getattr(getattr(view, "view_class", None), "max_queries", None)
+    if isinstance(budget, dict):
+        return budget.get("GET" if method == "HEAD" else method)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    In DEBUG, fail a request that runs more queries than ``max_queries``
+    of its class-based view for the request method. The budget covers the
+    whole request: the session and the user, the view and its template.
+
+    Put it above the middleware that query the database, so their queries
+    are counted as well. Tests check the same budgets with
+    task_manager.testing.QueryBudgetTestMixin.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        token = _query_counter.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_counter.reset(token)
+        match = request.resolver_match
+        max_queries = (
+            get_query_budget(match.func, request.method) if match else None)
+        if max_queries is not None and counter.count > max_queries:
+            raise QueryBudgetExceeded(
+                f"{match.view_name} ran {counter.count} queries, "
+                f"its budget is {max_queries}."
+            )
+        return response
+
+
+class NPlusOneMiddleware:
+    """
+    Find N+1 queries in templates: a relation loaded lazily more than once
+    from the same template line. That line runs once per object, in a
+    {% for %} loop or in a template rendered per row like tasks_row.html,
+    e.g. ``task.status.name`` for tasks fetched without select_related.
+
+    Each of them is logged as a warning of the "task_manager.nplusone"
+    logger with the template line, the expression and the relation; with
+    NPLUSONE_STRICT the request raises NPlusOneError instead, which tests
+    turn on. Only runs with NPLUSONE_DETECTION, DEBUG by default: finding
+    the template line walks the stack on every query.
+    """
+
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        lazy_loads = Counter()
+        token = _lazy_loads.set(lazy_loads)
+        try:
+            response = self.get_response(request)
+        finally:
+            _lazy_loads.reset(token)
+        problems = [
+            f"{template} loads {expression} ({relation}) {count} times"
+            for (template, expression, relation), count in lazy_loads.items()
+            if count > 1
+        ]
+        if problems and settings.NPLUSONE_STRICT:
+            raise NPlusOneError(
+                f"N+1 queries in {request.path}: " + "; ".join(problems))
+        for problem in problems:
+            nplusone_logger.warning(
+                "N+1 queries in %s: %s", request.path, problem,
+                extra={"path": request.path},
+            )
+        return response
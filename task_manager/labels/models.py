@@ -14,15 +14,22 @@ class Label(models.Model):
     updated_at = models.DateTimeField(
         auto_now=True,
         verbose_name=_("Updated at"))
+    # Поддерживается задачами (см. task_manager.tasks.counters)
+    task_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_("Tasks"))
     messege_valid = _("Label is in use and cannot be deleted.")
 
     def __str__(self):
         return self.name
 
     def can_delete(self):
-        return not self.tasks_labels.exists()
+        return self.task_count == 0
 
     def delete(self, *args, **kwargs):
+        # Счётчик в памяти мог устареть, перед удалением берём свежий
+        self.refresh_from_db(fields=["task_count"])
         if not self.can_delete():
             raise ValidationError(self.messege_valid)
         super().delete(*args, **kwargs)
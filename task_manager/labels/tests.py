@@ -1,10 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
-from django.urls import reverse_lazy
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
 
 from task_manager.labels.models import Label
 from task_manager.statuses.models import Status
+from task_manager.tasks.counters import change_counts
 from task_manager.tasks.models import Task
+from task_manager.testing import BUDGET_DATASET_SIZES, QueryBudgetTestMixin
 
 User = get_user_model()
 
@@ -151,3 +155,68 @@ class TestLabel(TestCase):
 
         self.assertEqual(Label.objects.count(), 2)
         self.assertTrue(Label.objects.filter(id=self.label.id).exists())
+
+    def test_label_list_shows_usage(self):
+        status = Status.objects.create(name="In Progress")
+        for number in range(2):
+            task = Task.objects.create(
+                name=f"Task {number}",
+                description="Task description",
+                status=status,
+                owner=self.user,
+                executor=self.user,
+            )
+            task.labels.add(self.label)
+        self.client.login(username="TestUser", password="password123")
+        # Первый запрос кладёт пользователя сессии в кэш
+        self.client.get(self.labels_url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.labels_url)
+        self.assertContains(response, "Используется (2 задачи)")
+        self.assertNotContains(response, self.delete_url)
+
+        for number in range(5):
+            Label.objects.create(name=f"Label {number}")
+        with CaptureQueriesContext(connection) as more_rows:
+            self.client.get(self.labels_url)
+        self.assertEqual(len(more_rows), len(context))
+
+
+class LabelQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="TestUser")
+        self.status = Status.objects.create(name="Status")
+        self.label = Label.objects.create(name="Label")
+        self.client.force_login(self.user)
+
+    def populate(self, size):
+        tasks = Task.objects.bulk_create(
+            Task(name=f"Task {number}", status=self.status, owner=self.user,
+                 executor=self.user)
+            for number in range(self.label.tasks_labels.count(), size)
+        )
+        Task.labels.through.objects.bulk_create(
+            Task.labels.through(task=task, label=self.label)
+            for task in tasks
+        )
+        change_counts(Label, {self.label.pk: len(tasks)})
+
+    def test_label_delete(self):
+        self.assertQueryBudget(
+            reverse("labels:labels_delete", kwargs={"pk": self.label.pk}),
+            self.populate)
+
+    def test_label_in_use_not_deleted(self):
+        self.assertQueryBudget(
+            reverse("labels:labels_delete", kwargs={"pk": self.label.pk}),
+            self.populate, method="POST")
+
+    def test_unused_label_deleted(self):
+        unused = Label.objects.create(name="Unused")
+
+        # Удалить можно один раз: проверяем на самом большом наборе
+        self.assertQueryBudget(
+            reverse("labels:labels_delete", kwargs={"pk": unused.pk}),
+            self.populate, sizes=BUDGET_DATASET_SIZES[-1:], method="POST")
+        self.assertFalse(Label.objects.filter(pk=unused.pk).exists())
@@ -5,7 +5,7 @@ from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
-from task_manager.mixins import CustomLoginRequiredMixin
+from task_manager.mixins import CustomLoginRequiredMixin, ReplicaReadMixin
 
 from .forms import LabelForm
 from .models import Label
@@ -13,8 +13,9 @@ from .models import Label
 SUCCESS_URL = "labels:labels_index"
 
 
-class LabelListView(CustomLoginRequiredMixin, ListView):
+class LabelListView(CustomLoginRequiredMixin, ReplicaReadMixin, ListView):
     model = Label
+    replica_models = (Label,)
     template_name = "labels/labels_index.html"
     context_object_name = "labels"
 
@@ -57,6 +58,8 @@ class LabelDeleteView(
     success_delete_message = _("Label deleted successfully")
     message_warning_perm = _("Label is in use and cannot be deleted.")
     form_title = _("Delete label")
+    # POST ещё раз читает объект, сверяет число задач и удаляет
+    max_queries = {"GET": 3, "POST": 7}
 
     def form_valid(self, form):
         self.object = self.get_object()
@@ -0,0 +1,403 @@
+import io
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connections
+from django.urls import reverse
+
+from task_manager.benchmarks import percentile
+from task_manager.labels.models import Label
+from task_manager.statuses.models import Status
+from task_manager.tasks.models import Task
+from task_manager.users.models import User
+
+LOAD_TEST_PASSWORD = "password"
+# Доли сценариев по умолчанию: чтения заметно больше, чем записей
+DEFAULT_MIX = {
+    "login": 5,
+    "list": 40,
+    "detail": 25,
+    "create": 10,
+    "update": 10,
+    "delete": 10,
+}
+# Сколько существующих задач открывать в сценарии detail
+DETAIL_SAMPLE = 1000
+
+
+def parse_mix(value):
+    """Parse ``"list=40,detail=25"`` into weights of known scenarios."""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario: {name!r}.")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Weight of {name} is not a number.")
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name} can't be negative.")
+    if not any(mix.values()):
+        raise ValueError("At least one scenario needs a positive weight.")
+    return mix
+
+
+def default_host():
+    """A host the application accepts: the first exact ALLOWED_HOSTS entry."""
+    for host in settings.ALLOWED_HOSTS:
+        if "*" not in host and not host.startswith("."):
+            return host
+    return "localhost"
+
+
+class WSGIBrowser:
+    """
+    One client of a WSGI application: keeps its cookies and sends the CSRF
+    token with forms, like a browser would.
+    """
+
+    def __init__(self, application, host):
+        self.application = application
+        self.host = host
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        """Return the status code and the body of the response."""
+        body = urlencode(data or {}, doseq=True).encode()
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": self.host,
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": io.StringIO(),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        if method == "POST":
+            environ["CONTENT_TYPE"] = "application/x-www-form-urlencoded"
+            environ["CONTENT_LENGTH"] = str(len(body))
+        if self.cookies:
+            environ["HTTP_COOKIE"] = "; ".join(
+                f"{name}={value}" for name, value in self.cookies.items())
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = headers
+
+        result = self.application(environ, start_response)
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        for name, value in started["headers"]:
+            if name.lower() == "set-cookie":
+                self.store_cookie(value)
+        return started["status"], content
+
+    def store_cookie(self, header):
+        for name, morsel in SimpleCookie(header).items():
+            # Удаление cookie - пустое значение с max-age=0
+            if morsel["max-age"] == "0" or not morsel.value:
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = morsel.value
+
+    def post(self, path, data):
+        data = {
+            "csrfmiddlewaretoken": self.cookies.get("csrftoken", ""),
+            **(data or {}),
+        }
+        return self.request("POST", path, data)
+
+
+class SimulatedUser:
+    """A logged in user running scenarios picked by their weights."""
+
+    def __init__(self, load_test, user, rng):
+        self.load_test = load_test
+        self.user = user
+        self.rng = rng
+        self.browser = WSGIBrowser(load_test.application, load_test.host)
+        # Задачи пользователя: их он изменяет и удаляет
+        self.tasks = []
+        self.created = 0
+        self.error = None
+
+    def run(self, stop_at, requests):
+        scenarios = list(self.load_test.mix)
+        weights = list(self.load_test.mix.values())
+        try:
+            self.login()
+            done = 0
+            while time.monotonic() < stop_at and done != requests:
+                name = self.rng.choices(scenarios, weights)[0]
+                getattr(self, f"scenario_{name}")()
+                done += 1
+                if self.load_test.think_time:
+                    time.sleep(self.rng.uniform(
+                        0, 2 * self.load_test.think_time))
+        except Exception as e:
+            # Ошибка самого прогона, не приложения: её покажет LoadTest.run
+            self.error = e
+        finally:
+            # Потоки не возвращаются в пул Django: соединения закрываем сами
+            connections.close_all()
+
+    def call(self, url_name, method, path, data=None, expect=(200, 302)):
+        close_old_connections()
+        start = time.perf_counter()
+        if method == "POST":
+            status, content = self.browser.post(path, data)
+        else:
+            status, content = self.browser.request(method, path)
+        self.load_test.stats.record(
+            f"{method} {url_name}", time.perf_counter() - start,
+            status in expect)
+        return status, content
+
+    def login(self):
+        self.browser.cookies.clear()
+        path = reverse("login")
+        self.call("login", "GET", path)
+        status, _ = self.call("login", "POST", path, {
+            "username": self.user.username,
+            "password": LOAD_TEST_PASSWORD,
+        }, expect=(302,))
+        return status == 302
+
+    def scenario_login(self):
+        self.login()
+
+    def scenario_list(self):
+        filters = self.rng.choice(self.load_test.filters)
+        path = reverse("tasks:tasks_index")
+        if filters:
+            path = f"{path}?{urlencode(filters)}"
+        self.call("tasks:tasks_index", "GET", path)
+
+    def scenario_detail(self):
+        ids = self.load_test.task_ids + self.tasks
+        if not ids:
+            return self.scenario_create()
+        pk = self.rng.choice(ids)
+        self.call(
+            "tasks:tasks_detail", "GET",
+            reverse("tasks:tasks_detail", kwargs={"pk": pk}),
+            # Задачу мог удалить её владелец
+            expect=(200, 404),
+        )
+
+    def scenario_create(self):
+        path = reverse("tasks:tasks_create")
+        self.call("tasks:tasks_create", "GET", path)
+        self.created += 1
+        name = f"{self.user.username}-task-{self.created}"
+        status, _ = self.call(
+            "tasks:tasks_create", "POST", path, self.task_data(name),
+            expect=(302,),
+        )
+        if status == 302:
+            # Ответ - редирект на список, id узнаём из базы
+            pk = (
+                Task.objects.filter(name=name)
+                .values_list("pk", flat=True).first()
+            )
+            if pk is not None:
+                self.tasks.append(pk)
+
+    def scenario_update(self):
+        if not self.tasks:
+            return self.scenario_create()
+        pk = self.rng.choice(self.tasks)
+        path = reverse("tasks:tasks_update", kwargs={"pk": pk})
+        self.call("tasks:tasks_update", "GET", path)
+        self.call(
+            "tasks:tasks_update", "POST", path,
+            self.task_data(f"{self.user.username}-task-{pk}-updated"),
+            expect=(302,),
+        )
+
+    def scenario_delete(self):
+        if not self.tasks:
+            return self.scenario_create()
+        pk = self.tasks.pop(self.rng.randrange(len(self.tasks)))
+        path = reverse("tasks:tasks_delete", kwargs={"pk": pk})
+        self.call("tasks:tasks_delete", "GET", path)
+        self.call("tasks:tasks_delete", "POST", path, expect=(302,))
+
+    def task_data(self, name):
+        load_test = self.load_test
+        data = {
+            "name": name,
+            "description": "Load test task",
+            "status": self.rng.choice(load_test.status_ids),
+            "executor": self.rng.choice(load_test.executor_ids),
+        }
+        if load_test.label_ids:
+            data["labels"] = self.rng.sample(
+                load_test.label_ids, min(2, len(load_test.label_ids)))
+        return data
+
+
+class Stats:
+    """Latencies and failures per ``"METHOD url_name"``, thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        """Throughput and latency percentiles per URL name and in total."""
+        with self.lock:
+            latencies = {
+                name: sorted(values)
+                for name, values in self.latencies.items()
+            }
+            errors = dict(self.errors)
+        every = sorted(value for values in latencies.values()
+                       for value in values)
+        results = {
+            name: self.describe(values, errors.get(name, 0), elapsed)
+            for name, values in sorted(latencies.items())
+        }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "total": self.describe(every, sum(errors.values()), elapsed),
+            "results": results,
+        }
+
+    @staticmethod
+    def describe(latencies, errors, elapsed):
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+
+
+class LoadTest:
+    """
+    Replay a weighted mix of scenarios against the WSGI application in
+    this process, one thread per simulated user.
+
+    Every simulated user is a new account that logs in first and then
+    keeps picking scenarios until ``duration`` seconds pass or it has run
+    ``requests`` of them. Tasks are created, changed and deleted by their
+    owners only; list and detail pages read existing tasks as well. The
+    accounts and whatever tasks they leave are deleted by ``cleanup``.
+
+    All threads share one interpreter, so the result is what a single
+    gunicorn worker with ``users`` threads can serve.
+    """
+
+    def __init__(self, users=10, mix=None, think_time=0.0, application=None,
+                 host=None, random_seed=None):
+        if application is None:
+            from task_manager.wsgi import application
+        self.application = application
+        self.host = host or default_host()
+        self.mix = {
+            name: weight
+            for name, weight in (mix or DEFAULT_MIX).items() if weight
+        }
+        self.think_time = think_time
+        self.rng = random.Random(random_seed)
+        self.stats = Stats()
+        self.status_ids = list(Status.objects.values_list("pk", flat=True))
+        if not self.status_ids:
+            raise ValueError("There are no statuses to create tasks with.")
+        self.label_ids = list(Label.objects.values_list("pk", flat=True))
+        self.task_ids = list(
+            Task.objects.order_by("-pk")
+            .values_list("pk", flat=True)[:DETAIL_SAMPLE]
+        )
+        self.users = self.create_users(users)
+        self.executor_ids = [user.pk for user in self.users]
+        self.filters = self.make_filters()
+
+    def create_users(self, count):
+        prefix = f"load-{uuid.uuid4().hex[:8]}"
+        password = make_password(LOAD_TEST_PASSWORD)
+        return User.objects.bulk_create(
+            User(
+                username=f"{prefix}-{number}",
+                first_name="Load",
+                last_name=f"Test {number}",
+                password=password,
+            )
+            for number in range(count)
+        )
+
+    def make_filters(self):
+        """Query strings of the list scenario, without filters among them."""
+        filters = [{}, {"my_tasks": "on"}, {"q": "task"}]
+        filters += [{"status": pk} for pk in self.status_ids[:5]]
+        filters += [{"labels": pk} for pk in self.label_ids[:5]]
+        filters += [{"executor": pk} for pk in self.executor_ids[:5]]
+        return filters
+
+    def run(self, duration=None, requests=None):
+        """
+        Run the simulated users and return ``Stats.summary``. Each of them
+        stops after ``duration`` seconds or ``requests`` scenarios,
+        whichever comes first.
+        """
+        stop_at = time.monotonic() + duration if duration else float("inf")
+        simulated = [
+            SimulatedUser(self, user, random.Random(self.rng.random()))
+            for user in self.users
+        ]
+        threads = [
+            threading.Thread(
+                target=user.run, args=(stop_at, requests),
+                name=f"load-test-{number}",
+            )
+            for number, user in enumerate(simulated)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for user in simulated:
+            if user.error is not None:
+                raise user.error
+        return self.stats.summary(time.perf_counter() - start)
+
+    def cleanup(self):
+        ids = [user.pk for user in self.users]
+        # Пользователей с задачами не удалить; удаление задач обновляет
+        # счётчики статусов и меток
+        Task.objects.filter(owner__in=ids).delete()
+        User.objects.filter(pk__in=ids).delete()
@@ -0,0 +1,193 @@
+import json
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from task_manager.benchmarks import (
+    benchmark_user,
+    find_regressions,
+    iter_views,
+    percentile,
+    testserver_settings,
+)
+from task_manager.labels.models import Label
+from task_manager.seeding import seed
+from task_manager.statuses.models import Status
+from task_manager.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency, query count and allocated memory of a GET of "
+        "every view of task_manager.urls as a logged in user, optionally "
+        "seeding data first. Results can be written as JSON and compared "
+        "with a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed-tasks", type=int, default=0,
+            help="Generate this many tasks before measuring.",
+        )
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--statuses", type=int, default=5)
+        parser.add_argument("--labels", type=int, default=50)
+        parser.add_argument(
+            "--labels-per-task", type=int, default=2,
+            help="Average number of labels of a generated task.",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=20,
+            help="Timed requests per view, after one warm-up request.",
+        )
+        parser.add_argument(
+            "--cold", action="store_true",
+            help="Clear the cache before every request.",
+        )
+        parser.add_argument("--output", help="Write the results to this file.")
+        parser.add_argument(
+            "--baseline",
+            help="Fail when results regress against this results file.",
+        )
+        parser.add_argument(
+            "--threshold", type=float, default=20,
+            help="Allowed growth of latency and memory, in percent.",
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be positive.")
+        if options["seed_tasks"]:
+            counts = seed(
+                users=options["users"],
+                statuses=options["statuses"],
+                labels=options["labels"],
+                tasks=options["seed_tasks"],
+                labels_per_task=options["labels_per_task"],
+            )
+            self.stdout.write(f"Seeded: {counts}")
+        status = Status.objects.order_by("pk").first()
+        if status is None:
+            raise CommandError("There are no statuses, use --seed-tasks.")
+
+        with benchmark_user() as user:
+            # Свою задачу пользователь может и изменить, и удалить
+            task = Task.objects.create(
+                name=f"{user.username}-task", status=status, owner=user,
+                executor=user)
+            task.labels.set(Label.objects.order_by("pk")[:3])
+            objects = {
+                "users": user,
+                "statuses": status,
+                "labels": Label.objects.order_by("pk").first(),
+                "tasks": task,
+                "tasks_api": task,
+            }
+            client = Client()
+            client.force_login(user)
+            try:
+                with testserver_settings():
+                    results = {
+                        name: self.measure(client, url, options)
+                        for name, url in self.get_urls(objects)
+                    }
+            finally:
+                client.logout()
+                task.delete()
+
+        data = {
+            "meta": {
+                "created": timezone.now().isoformat(),
+                "database": connection.vendor,
+                "tasks": Task.objects.count(),
+                "repeat": options["repeat"],
+                "cold": options["cold"],
+            },
+            "results": results,
+        }
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(data, file, indent=2)
+        if options["baseline"]:
+            self.compare(results, options)
+
+    def get_urls(self, objects):
+        for name, arguments in iter_views():
+            namespace = name.partition(":")[0]
+            if arguments:
+                obj = objects.get(namespace)
+                if obj is None:
+                    self.stderr.write(f"Skipped {name}: no object to show.")
+                    continue
+                yield name, reverse(
+                    name, kwargs={argument: obj.pk for argument in arguments})
+            else:
+                yield name, reverse(name)
+
+    def measure(self, client, url, options):
+        self.get(client, url, options)
+
+        latencies = []
+        queries = []
+        for _ in range(options["repeat"]):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                status_code = self.get(client, url, options)
+                latencies.append(time.perf_counter() - start)
+            queries.append(len(captured))
+
+        # tracemalloc замедляет запрос, поэтому память меряется отдельно
+        tracemalloc.start()
+        try:
+            self.get(client, url, options)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            "url": url,
+            "status": status_code,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "queries": max(queries),
+            "memory_kib": round(peak / 1024, 1),
+        }
+
+    def get(self, client, url, options):
+        if options["cold"]:
+            cache.clear()
+        response = client.get(url)
+        if response.streaming:
+            # Выгрузка строится по мере чтения ответа
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        return response.status_code
+
+    def report(self, results):
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name} ({result['status']}): p50 {result['p50_ms']} ms, "
+                f"p95 {result['p95_ms']} ms, {result['queries']} queries, "
+                f"{result['memory_kib']} KiB"
+            )
+
+    def compare(self, results, options):
+        with open(options["baseline"]) as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(
+            results, baseline, options["threshold"])
+        if regressions:
+            raise CommandError(
+                "Regressions against the baseline:\n" + "\n".join(regressions))
+        self.stdout.write("No regressions against the baseline.")
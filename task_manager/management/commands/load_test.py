@@ -0,0 +1,102 @@
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from task_manager.loadtest import DEFAULT_MIX, LoadTest, parse_mix
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test task_manager.wsgi.application in this process: many "
+        "simulated users log in and replay a weighted mix of login, task "
+        "list with filters, detail, create, update and delete. Reports "
+        "throughput and p50/p95/p99 latency per URL name. All users share "
+        "one interpreter, so --users is the thread count of one worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=10,
+            help="Concurrent simulated users, each with its own session.",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30,
+            help="Seconds to run; 0 to rely on --requests only.",
+        )
+        parser.add_argument(
+            "--requests", type=int,
+            help="Scenarios per simulated user, after logging in.",
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help="Weights of the scenarios, e.g. list=40,detail=25.",
+        )
+        parser.add_argument(
+            "--think-time", type=float, default=0,
+            help="Average pause between scenarios of a user, in seconds.",
+        )
+        parser.add_argument("--host", help="Host header of the requests.")
+        parser.add_argument("--random-seed", type=int)
+        parser.add_argument("--output", help="Write the results to this file.")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("--users must be positive.")
+        if not options["duration"] and not options["requests"]:
+            raise CommandError("Set --duration or --requests.")
+        try:
+            mix = parse_mix(options["mix"])
+            load_test = LoadTest(
+                users=options["users"],
+                mix=mix,
+                think_time=options["think_time"],
+                host=options["host"],
+                random_seed=options["random_seed"],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+
+        # Строка на каждый запрос заняла бы весь вывод и часть времени
+        timing_logger = logging.getLogger("task_manager.timing")
+        level = timing_logger.level
+        timing_logger.setLevel(logging.WARNING)
+        try:
+            summary = load_test.run(
+                duration=options["duration"], requests=options["requests"])
+        finally:
+            timing_logger.setLevel(level)
+            load_test.cleanup()
+
+        self.report(summary)
+        if options["output"]:
+            data = {
+                "meta": {
+                    "created": timezone.now().isoformat(),
+                    "database": connection.vendor,
+                    "users": options["users"],
+                    "mix": mix,
+                    "think_time": options["think_time"],
+                },
+                **summary,
+            }
+            with open(options["output"], "w") as file:
+                json.dump(data, file, indent=2)
+
+    def report(self, summary):
+        rows = [("total", summary["total"]), *summary["results"].items()]
+        width = max(len(name) for name, _ in rows)
+        self.stdout.write(
+            f"{'':{width}}  requests errors    rps    p50    p95    p99 (ms)")
+        for name, result in rows:
+            self.stdout.write(
+                f"{name:{width}}  {result['requests']:8} "
+                f"{result['errors']:6} {result['rps']:6} "
+                f"{result['p50_ms']:6} {result['p95_ms']:6} "
+                f"{result['p99_ms']:6}"
+            )
+        self.stdout.write(f"{summary['elapsed_s']} s")
@@ -0,0 +1,54 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired sessions from the database in small batches. "
+        "Every batch is committed separately, so the command can be "
+        "stopped at any time and run again to continue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--sleep", type=float, default=0,
+            help="Seconds to wait between batches.",
+        )
+        parser.add_argument(
+            "--max-batches", type=int,
+            help="Stop after this many batches.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        max_batches = options["max_batches"]
+
+        # Граница фиксируется при запуске, иначе команда гонялась бы за
+        # сессиями, которые истекают прямо во время чистки
+        expired = (
+            Session.objects
+            .filter(expire_date__lt=timezone.now())
+            .order_by("expire_date")
+            .values_list("pk", flat=True)
+        )
+        deleted = batches = 0
+        while max_batches is None or batches < max_batches:
+            keys = list(expired[:batch_size])
+            if not keys:
+                break
+            count, _ = Session.objects.filter(pk__in=keys).delete()
+            deleted += count
+            batches += 1
+            self.stdout.write(f"Deleted {deleted} sessions")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {deleted} expired sessions deleted")
+        )
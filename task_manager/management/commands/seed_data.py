@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.seeding import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, statuses, labels and tasks with realistic skew: a "
+        "few executors and statuses get most of the tasks. Rows are bulk "
+        "inserted and all users share one pre-hashed password, so a million "
+        "tasks take well under a minute."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--statuses", type=int, default=10)
+        parser.add_argument("--labels", type=int, default=100)
+        parser.add_argument("--tasks", type=int, default=100000)
+        parser.add_argument(
+            "--labels-per-task", type=int, default=2,
+            help="Average number of labels of a task.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--random-seed", type=int,
+            help="Generate the same data on every run.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 1 or options["statuses"] < 1:
+            raise CommandError("--users and --statuses must be positive.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if min(options["tasks"], options["labels"],
+               options["labels_per_task"]) < 0:
+            raise CommandError(
+                "--tasks, --labels and --labels-per-task can't be negative.")
+
+        start = time.perf_counter()
+        counts = seed(
+            users=options["users"],
+            statuses=options["statuses"],
+            labels=options["labels"],
+            tasks=options["tasks"],
+            labels_per_task=options["labels_per_task"],
+            batch_size=options["batch_size"],
+            random_seed=options["random_seed"],
+        )
+        self.stdout.write(
+            f"Seeded {counts} in {time.perf_counter() - start:.1f} s. "
+            f'Users log in with the password "{SEED_PASSWORD}".'
+        )
@@ -1,7 +1,17 @@
+import hashlib
+import inspect
+
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from task_manager.cache import model_namespace
+from task_manager.routers import use_replica
 
 
 class CustomLoginRequiredMixin(LoginRequiredMixin):
@@ -13,3 +23,96 @@ class CustomLoginRequiredMixin(LoginRequiredMixin):
         if not self.request.user.is_authenticated:
             messages.error(self.request, self.permission_denied_message)
         return super().handle_no_permission()
+
+
+class ReplicaReadMixin:
+    """
+    Read the page from the replica (see task_manager.routers).
+
+    ``replica_models`` are the models the page shows; right after one of
+    them changes the page is still read from the primary.
+    """
+    replica_models = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            use_replica(
+                model_namespace(model) for model in self.replica_models)
+        return super().dispatch(request, *args, **kwargs)
+
+
+class JsonLoginRequiredMixin:
+    permission_denied_message = _(
+        "Authentication credentials were not provided."
+    )
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {"detail": str(self.permission_denied_message)}, status=401
+            )
+        return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Answer repeat GET requests with 304 Not Modified.
+
+    Views override ``get_validators()`` to return the values the page is
+    built from and the time of its last change, None when it's unknown;
+    the default ``None`` always renders the page. The ETag also covers the
+    user, the session and the language, so a page is never reused across
+    them.
+    """
+
+    def get_validators(self):
+        return None
+
+    def has_pending_messages(self, request):
+        # Сообщение показывается один раз, страницу с ним нужно отрисовать
+        return bool(len(messages.get_messages(request)))
+
+    def get(self, request, *args, **kwargs):
+        if self.has_pending_messages(request):
+            return super().get(request, *args, **kwargs)
+        validators = self.get_validators()
+        if validators is None:
+            return super().get(request, *args, **kwargs)
+        return self.get_conditional_view(super().get, validators)(
+            request, *args, **kwargs)
+
+    def get_conditional_view(self, view, validators):
+        """Wrap ``view``, sync or async, in the conditional GET checks."""
+        parts, last_modified = validators
+        etag = hashlib.md5(
+            repr((
+                *parts,
+                self.request.user.pk,
+                self.request.session.session_key,
+                get_language(),
+            )).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        view = condition(
+            etag_func=lambda *args, **kwargs: etag,
+            last_modified_func=lambda *args, **kwargs: last_modified,
+        )(view)
+        # Браузер хранит страницу, но каждый раз сверяется с сервером
+        return cache_control(private=True, no_cache=True)(view)
+
+
+class AsyncUserMixin:
+    """
+    Load the user with ``request.auser()`` before an async view runs.
+
+    The session is loaded along with it, so LoginRequiredMixin, messages
+    and templates then read ``request.user`` without touching the database.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        response = super().dispatch(request, *args, **kwargs)
+        # Без входа LoginRequiredMixin отвечает редиректом сразу
+        if inspect.isawaitable(response):
+            response = await response
+        return response
@@ -0,0 +1,267 @@
+import asyncio
+import base64
+import binascii
+import json
+import operator
+from datetime import date, datetime
+from functools import reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values, direction=NEXT):
+    payload = json.dumps(
+        {"v": [_dump_value(value) for value in values], "d": direction},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload["v"], payload["d"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(_("Invalid cursor"))
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(_("Invalid cursor"))
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(_("Invalid cursor"))
+    return values, direction
+
+
+def _dump_value(value):
+    # isoformat() сохраняет микросекунды, в отличие от DjangoJSONEncoder
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def estimate_count(queryset):
+    """Return the planner's row estimate, or None if it is unavailable."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPaginator:
+    """
+    Seek pagination over a fixed ordering that ends with a unique field.
+
+    Every page costs the same regardless of its depth: the cursor holds
+    the ordering values of the edge row and the next page is fetched with
+    a WHERE clause on them instead of OFFSET.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        per_page,
+        ordering=("-created_at", "-id"),
+        estimate_count=False,
+    ):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.estimate_count = estimate_count
+
+    @cached_property
+    def _count(self):
+        if self.estimate_count:
+            estimate = estimate_count(self.queryset)
+            threshold = settings.PAGINATION_ESTIMATE_THRESHOLD
+            # Маленькие выборки дешевле посчитать точно
+            if estimate is not None and estimate >= threshold:
+                return estimate, True
+        return self.queryset.count(), False
+
+    @property
+    def count(self):
+        return self._count[0]
+
+    @property
+    def count_is_estimate(self):
+        return self._count[1]
+
+    async def acount(self):
+        """Async ``count``; afterwards ``count`` is served without a query."""
+        if self.estimate_count:
+            # Оценку планировщика даёт только синхронный курсор
+            await sync_to_async(lambda: self._count)()
+        else:
+            self.__dict__["_count"] = await self.queryset.acount(), False
+        return self.count
+
+    def page(self, cursor=None):
+        queryset, values, reverse = self._page_query(cursor)
+        return self._make_page(list(queryset), values, reverse)
+
+    async def apage(self, cursor=None):
+        queryset, values, reverse = self._page_query(cursor)
+        # С prefetch_related() aiterator() догружает связи пачками
+        rows = [
+            row async for row in queryset.aiterator(
+                chunk_size=self.per_page + 1)
+        ]
+        return self._make_page(rows, values, reverse)
+
+    def _page_query(self, cursor):
+        if not cursor:
+            values, direction = None, NEXT
+        else:
+            values, direction = decode_cursor(cursor, len(self.ordering))
+        reverse = direction == PREVIOUS
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._seek(values, reverse))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor(_("Invalid cursor"))
+        return queryset[:self.per_page + 1], values, reverse
+
+    def _make_page(self, rows, values, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        return KeysetPage(self, rows, has_next, has_previous)
+
+    def _fields(self):
+        return [
+            (name.lstrip("-"), name.startswith("-")) for name in self.ordering
+        ]
+
+    def _order_by(self, reverse):
+        return [
+            f"-{name}" if descending != reverse else name
+            for name, descending in self._fields()
+        ]
+
+    def _seek(self, values, reverse):
+        # (a, b) < (x, y)  =>  a < x OR (a = x AND b < y)
+        conditions = []
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), values):
+            lookup = "lt" if descending != reverse else "gt"
+            conditions.append(equal & Q(**{f"{name}__{lookup}": value}))
+            equal &= Q(**{name: value})
+        return reduce(operator.or_, conditions)
+
+    def cursor_for(self, row, direction):
+        # Строки могут быть и моделями, и словарями из values()
+        if isinstance(row, dict):
+            values = [row[name] for name, _ in self._fields()]
+        else:
+            values = [getattr(row, name) for name, _ in self._fields()]
+        return encode_cursor(values, direction)
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.paginator.cursor_for(self.object_list[-1], NEXT)
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.paginator.cursor_for(self.object_list[0], PREVIOUS)
+
+    @property
+    def count(self):
+        return self.paginator.count
+
+    @property
+    def count_is_estimate(self):
+        return self.paginator.count_is_estimate
+
+
+class KeysetPaginationMixin:
+    """Replace OFFSET pagination of a ListView with keyset pagination."""
+    paginate_by = 50
+    cursor_kwarg = "cursor"
+    keyset_ordering = ("-created_at", "-id")
+    estimate_count = None
+
+    def get_keyset_ordering(self, queryset):
+        return self.keyset_ordering
+
+    def get_estimate_count(self):
+        if self.estimate_count is None:
+            return settings.PAGINATION_ESTIMATE_COUNT
+        return self.estimate_count
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return KeysetPaginator(
+            queryset,
+            page_size,
+            ordering=self.get_keyset_ordering(queryset),
+            estimate_count=self.get_estimate_count(),
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Async ``paginate_queryset()``; the total is counted alongside."""
+        paginator = self.get_keyset_paginator(queryset, page_size)
+        try:
+            page, _count = await asyncio.gather(
+                paginator.apage(self.request.GET.get(self.cursor_kwarg)),
+                paginator.acount(),
+            )
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,142 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from task_manager.cache import changed_recently
+
+REPLICA = "replica"
+PIN_COOKIE = "pin_primary"
+# Сессию только что записали при входе, читать её можно лишь с основной базы
+PRIMARY_APPS = {"sessions"}
+
+_state = ContextVar("database_routing", default=None)
+
+
+class RoutingState:
+    """How the current request may read: set up by ReplicaPinningMiddleware."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.namespaces = None
+        self.fresh = None
+
+    def reads_replica(self):
+        if self.namespaces is None or self.pinned or self.wrote:
+            return False
+        if self.fresh is None:
+            # Реплика могла ещё не получить недавние изменения, а кэш уже
+            # сбросил версию: такое читаем с основной базы
+            self.fresh = not changed_recently(*self.namespaces)
+        return self.fresh
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def use_replica(namespaces):
+    """
+    Let the current request read from the replica.
+
+    ``namespaces`` are the cache namespaces the page is built from; while
+    one of them has changed recently, reads stay on the primary.
+    """
+    state = _state.get()
+    if state is not None and replica_configured():
+        state.namespaces = tuple(namespaces)
+
+
+class ReplicaRouter:
+    """
+    Send reads of views marked with ReplicaReadMixin to the replica.
+
+    Everything else, writes and the reads of a request that has written
+    go to the primary. A client that wrote is pinned to the primary for
+    DATABASE_REPLICA_PIN_SECONDS, so it reads its own writes.
+    """
+    replica = REPLICA
+
+    def route_to_replica(self, model):
+        state = _state.get()
+        return (
+            state is not None
+            and model._meta.app_label not in PRIMARY_APPS
+            and state.reads_replica()
+        )
+
+    def db_for_read(self, model, **hints):
+        if self.route_to_replica(model):
+            return self.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной базы, связи между ними допустимы
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaPinningMiddleware:
+    """
+    Track the writes of a request for ReplicaRouter.
+
+    After a write the response sets a cookie that keeps the client on the
+    primary for DATABASE_REPLICA_PIN_SECONDS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(pinned=self.is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        state = RoutingState(pinned=self.is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.pin(response, state)
+
+    def is_pinned(self, request):
+        try:
+            until = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            return False
+        return until > time.time()
+
+    def pin(self, response, state):
+        if state.wrote and replica_configured():
+            seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(int(time.time()) + seconds),
+                max_age=seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
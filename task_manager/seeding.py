@@ -0,0 +1,238 @@
+import itertools
+import random
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from task_manager.cache import bump_version, model_namespace
+from task_manager.labels.models import Label
+from task_manager.statuses.models import Status
+from task_manager.tasks.counters import change_counts
+from task_manager.tasks.models import Task
+from task_manager.tasks.search import deferred_search_index
+from task_manager.users.models import User
+
+SEED_PASSWORD = "password"
+# Показатели распределения Ципфа: исполнители - у немногих большая часть
+# задач, статусы - почти все задачи в двух-трёх "горячих"
+EXECUTOR_SKEW = 1.0
+STATUS_SKEW = 1.5
+TASK_FIELDS = (
+    "id", "name", "description", "status", "owner", "executor",
+    "created_at", "updated_at",
+)
+
+
+def seed(
+    users=50,
+    statuses=5,
+    labels=20,
+    tasks=1000,
+    labels_per_task=2,
+    batch_size=5000,
+    random_seed=None,
+):
+    """
+    Fill the database with generated users, statuses, labels and tasks.
+
+    Users, statuses and labels are inserted with bulk_create, tasks and
+    their labels with plain executemany INSERTs: for millions of rows the
+    ORM's per-value preparation costs more than the database. All users
+    share one password hash, so seeding does not run the password hasher
+    per user. Task ids are assigned here, so nothing else should create
+    tasks while seeding runs.
+
+    The data is skewed like real data: executors and statuses of tasks
+    follow Zipf distributions, so a few users and statuses have most of
+    the tasks. A task gets from none to twice ``labels_per_task`` labels,
+    also picked with Zipf weights. Owners are uniform.
+    """
+    rng = random.Random(random_seed)
+    prefix = f"seed-{uuid.uuid4().hex[:8]}"
+    password = make_password(SEED_PASSWORD)
+
+    with transaction.atomic():
+        user_ids = _create(User, batch_size, (
+            User(
+                username=f"{prefix}-user-{number}",
+                first_name="Seed",
+                last_name=f"User {number}",
+                password=password,
+            )
+            for number in range(users)
+        ))
+        status_ids = _create(Status, batch_size, (
+            Status(name=f"{prefix}-status-{number}")
+            for number in range(statuses)
+        ))
+        label_ids = _create(Label, batch_size, (
+            Label(name=f"{prefix}-label-{number}")
+            for number in range(labels)
+        ))
+
+        last_id = Task.objects.aggregate(last=Max("pk"))["last"] or 0
+        with ExitStack() as loads:
+            if tasks and tasks >= Task.objects.count():
+                # Таблица как минимум удвоится: построить индексы заново
+                # дешевле, чем обновлять их на каждой строке
+                for model in (Task, Task.labels.through):
+                    loads.enter_context(_deferred_indexes(model))
+                loads.enter_context(
+                    deferred_search_index(connection, last_id + 1))
+            status_counts, label_counts = _create_tasks(
+                rng, prefix, tasks, last_id, user_ids, status_ids,
+                label_ids, labels_per_task, batch_size,
+            )
+        change_counts(Status, status_counts)
+        change_counts(Label, label_counts)
+        if tasks:
+            _reset_sequence(Task)
+
+        # bulk_create не шлёт сигналы: кэшированные списки выбора
+        # пользователей, статусов и меток и списки задач сбрасываем сами
+        transaction.on_commit(lambda: [
+            bump_version(model_namespace(model))
+            for model in (User, Status, Label, Task)
+        ])
+
+    return {
+        "users": len(user_ids),
+        "statuses": len(status_ids),
+        "labels": len(label_ids),
+        "tasks": tasks,
+    }
+
+
+def _create_tasks(rng, prefix, tasks, last_id, user_ids, status_ids,
+                  label_ids, labels_per_task, batch_size):
+    """
+    Insert tasks with ids after ``last_id`` and their labels. Return the
+    number of new tasks per status and per label.
+    """
+    pick_executors = _zipf_picker(rng, user_ids, EXECUTOR_SKEW)
+    pick_statuses = _zipf_picker(rng, status_ids, STATUS_SKEW)
+    label_weights = list(itertools.accumulate(zipf_weights(len(label_ids))))
+    status_counts = Counter()
+    label_counts = Counter()
+    task_id = last_id
+    now = timezone.now()
+    for start in range(0, tasks, batch_size):
+        size = min(batch_size, tasks - start)
+        # Задачи "создавались" в течение года, у пачки одно время
+        created_at = _db_datetime(
+            now - timedelta(days=365 * (1 - start / tasks)))
+        rows = []
+        links = []
+        # Выбор сразу на всю пачку: по одному он дороже самой вставки
+        for number, status_id, owner_id, executor_id, label_count in zip(
+            range(start, start + size),
+            pick_statuses(size),
+            rng.choices(user_ids, k=size),
+            pick_executors(size),
+            rng.choices(range(2 * labels_per_task + 1), k=size),
+        ):
+            task_id += 1
+            rows.append((
+                task_id, f"{prefix}-task-{number}", "Generated task",
+                status_id, owner_id, executor_id, created_at, created_at,
+            ))
+            links.extend(
+                (task_id, label_id)
+                for label_id in _sample(
+                    rng, label_ids, label_weights, label_count)
+            )
+        _insert(Task, TASK_FIELDS, rows)
+        _insert(Task.labels.through, ("task", "label"), links)
+        status_counts.update(row[3] for row in rows)
+        label_counts.update(label_id for _, label_id in links)
+    return status_counts, label_counts
+
+
+def zipf_weights(count, exponent=1.0):
+    """Weights of ``count`` items, the n-th being n**exponent times rarer."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def _zipf_picker(rng, ids, exponent):
+    """Return ``pick(k)``: k of the ids, drawn with Zipf weights."""
+    ids = list(ids)
+    # Самыми частыми должны стать случайные строки, а не первые созданные
+    rng.shuffle(ids)
+    cum_weights = list(itertools.accumulate(zipf_weights(len(ids), exponent)))
+    return lambda k: rng.choices(ids, cum_weights=cum_weights, k=k)
+
+
+def _sample(rng, population, cum_weights, count):
+    """``count`` distinct items picked by cumulative weights."""
+    if count >= len(population):
+        return population
+    picked = set()
+    while len(picked) < count:
+        picked.update(rng.choices(
+            population, cum_weights=cum_weights, k=count - len(picked)))
+    return picked
+
+
+def _db_datetime(value):
+    return Task._meta.get_field("created_at").get_db_prep_save(
+        value, connection)
+
+
+def _insert(model, fields, rows):
+    """INSERT ``rows`` (tuples of database values of ``fields``)."""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    columns = ", ".join(
+        quote(model._meta.get_field(field).column) for field in fields)
+    placeholders = ", ".join(["%s"] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+            f"VALUES ({placeholders})",
+            rows,
+        )
+
+
+@contextmanager
+def _deferred_indexes(model):
+    """
+    Drop the indexes of the model's table for the block and create them
+    again after it. SQLite only; the indexes SQLite makes itself for
+    UNIQUE columns stay.
+    """
+    indexes = []
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            # У автоматических индексов UNIQUE нет sql, они не трогаются
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = %s AND sql IS NOT NULL",
+                [model._meta.db_table],
+            )
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
+    yield
+    with connection.cursor() as cursor:
+        for _, sql in indexes:
+            cursor.execute(sql)
+
+
+def _reset_sequence(model):
+    # Ключи заданы явно: на PostgreSQL последовательность их не видела
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+            cursor.execute(sql)
+
+
+def _create(model, batch_size, objects):
+    created = model.objects.bulk_create(list(objects), batch_size=batch_size)
+    return [obj.pk for obj in created]
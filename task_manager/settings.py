@@ -61,6 +61,20 @@ ROLLBAR = {
 
 rollbar.init(**ROLLBAR)
 
+# Rollbar items are queued and sent by a background thread of each worker
+# (see task_manager.error_reporting), so reporting never blocks a request.
+# The sender posts up to ERROR_REPORT_BATCH_SIZE queued items at a time;
+# when the queue is full new items are dropped. After ERROR_REPORT_FAILURES
+# failed or slow sends in a row nothing is sent for ERROR_REPORT_COOLDOWN
+# seconds.
+ERROR_REPORT_QUEUE_SIZE = int(os.getenv('ERROR_REPORT_QUEUE_SIZE', 1000))
+ERROR_REPORT_BATCH_SIZE = int(os.getenv('ERROR_REPORT_BATCH_SIZE', 20))
+ERROR_REPORT_BATCH_WAIT = float(os.getenv('ERROR_REPORT_BATCH_WAIT', 1))
+ERROR_REPORT_TIMEOUT = float(os.getenv('ERROR_REPORT_TIMEOUT', 3))
+ERROR_REPORT_SLOW_SECONDS = float(os.getenv('ERROR_REPORT_SLOW_SECONDS', 1))
+ERROR_REPORT_FAILURES = int(os.getenv('ERROR_REPORT_FAILURES', 3))
+ERROR_REPORT_COOLDOWN = float(os.getenv('ERROR_REPORT_COOLDOWN', 30))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -83,6 +97,10 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'task_manager.instrumentation.ServerTimingMiddleware',
+    'task_manager.instrumentation.QueryBudgetMiddleware',
+    'task_manager.instrumentation.NPlusOneMiddleware',
+    'task_manager.routers.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -93,7 +111,8 @@ MIDDLEWARE = [
     'rollbar.contrib.django.middleware.RollbarNotifierMiddleware',
 ]
 
-ROOT_URLCONF = 'task_manager.urls'
+# task_manager.asgi switches to task_manager.asgi_urls with async task views
+ROOT_URLCONF = os.getenv('ROOT_URLCONF', 'task_manager.urls')
 
 TEMPLATES = [
     {
@@ -123,9 +142,150 @@ DATABASES = {
     }
 }
 
-db_from_env = dj_database_url.config(conn_max_age=600)
+db_from_env = dj_database_url.config(conn_max_age=600, conn_health_checks=True)
 DATABASES["default"].update(db_from_env)
 
+# Read replica. List and detail pages read from it (see task_manager.routers);
+# a client that has just written reads from the primary for
+# DATABASE_REPLICA_PIN_SECONDS, which should exceed the replication lag.
+DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = {
+        **dj_database_url.parse(
+            DATABASE_REPLICA_URL, conn_max_age=600, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['task_manager.routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.getenv('DATABASE_REPLICA_PIN_SECONDS', 5))
+
+# PostgreSQL connection pool (psycopg 3). Every worker process keeps its own
+# pool of DATABASE_POOL_MIN_SIZE..DATABASE_POOL_MAX_SIZE connections for each
+# database, checks a connection before handing it out and waits at most
+# DATABASE_POOL_TIMEOUT seconds for a free one. Usage is reported by /health/.
+DATABASE_POOL = os.getenv('DATABASE_POOL', 'true').lower() == 'true'
+for database in DATABASES.values():
+    if (not DATABASE_POOL
+            or database['ENGINE'] != 'django.db.backends.postgresql'):
+        continue
+    # Соединениями владеет пул, постоянные соединения Django с ним несовместимы
+    database['CONN_MAX_AGE'] = 0
+    database.setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DATABASE_POOL_MIN_SIZE', 1)),
+        'max_size': int(os.getenv('DATABASE_POOL_MAX_SIZE', 10)),
+        'timeout': float(os.getenv('DATABASE_POOL_TIMEOUT', 10)),
+        'max_idle': float(os.getenv('DATABASE_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.getenv('DATABASE_POOL_MAX_LIFETIME', 3600)),
+    }
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Versioned entries are invalidated through the cache itself, so every
+# worker must share it in production: set REDIS_URL there.
+
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Sessions: "db" (default), "cached_db", "cache" or "signed_cookies".
+# "cache" keeps sessions only in the cache, so it needs REDIS_URL.
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + os.getenv(
+    'SESSION_ENGINE', 'db')
+
+# The user of a session is kept in the cache between requests. ModelBackend
+# stays for sessions created before the cached backend: each session names
+# the backend that logged it in. Logins never reach it, the cached backend
+# rejects wrong passwords itself
+AUTHENTICATION_BACKENDS = [
+    'task_manager.users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+# Seconds to keep it; 0 reads the user on every request. Only a shared cache
+# drops the entry in every worker when the user changes, so it's on only
+# with REDIS_URL
+USER_CACHE_TIMEOUT = int(
+    os.getenv('USER_CACHE_TIMEOUT', 300 if REDIS_URL else 0))
+
+# Threads that check and hash passwords for the async login and registration
+# views; 0 hashes in the event loop itself
+PASSWORD_HASHING_WORKERS = int(
+    os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1))
+
+# Select choices (users, statuses, labels) of task forms and filters
+CHOICES_CACHE_TIMEOUT = int(os.getenv('CHOICES_CACHE_TIMEOUT', 300))
+
+# Rendered rows of the task table; stale rows are never served because the
+# key changes with the row, so the timeout only bounds memory use
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 3600))
+
+# Keyset pagination of long lists. On PostgreSQL the total can be taken from
+# the planner's estimate instead of COUNT(*) once it exceeds the threshold.
+PAGINATION_ESTIMATE_COUNT = os.getenv(
+    'PAGINATION_ESTIMATE_COUNT', 'false').lower() == 'true'
+PAGINATION_ESTIMATE_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 10000))
+
+# Server-Timing header and a "task_manager.timing" log line per request with
+# view, template and database time and the query count
+REQUEST_TIMING = os.getenv('REQUEST_TIMING', 'true').lower() == 'true'
+
+# Queries slower than SLOW_QUERY_SECONDS (0 turns this off) are logged as
+# JSON lines with their parameters, view, stack and the EXPLAIN plan (with
+# ANALYZE for SELECTs on PostgreSQL) taken in a background thread. The log
+# goes to the rotating SLOW_QUERY_LOG_FILE when it is set, else to stderr.
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_SECONDS', 0.5))
+SLOW_QUERY_EXPLAIN_BACKLOG = int(os.getenv('SLOW_QUERY_EXPLAIN_BACKLOG', 10))
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE')
+
+# Lazy FK and M2M loads repeated by one template line, in a {% for %} loop
+# or a template rendered per row (N+1), are logged to "task_manager.nplusone"
+# with the line and the relation; in strict mode the request fails instead
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_STRICT = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        } if SLOW_QUERY_LOG_FILE else {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'task_manager.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+        'task_manager.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'task_manager.nplusone': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -29,3 +29,10 @@ ROLLBAR = {
     'code_version': '1.0',
     'root': BASE_DIR,
 }
+
+# Шаблон с N+1 роняет тест, который его открыл
+NPLUSONE_DETECTION = True
+NPLUSONE_STRICT = True
+
+# Timing lines of every test request would flood the output
+LOGGING['loggers']['task_manager.timing']['level'] = 'WARNING'  # noqa: F405
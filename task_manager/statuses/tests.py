@@ -1,6 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
-from django.urls import reverse_lazy
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+
+from task_manager.tasks.counters import change_counts
+from task_manager.tasks.models import Task
+from task_manager.testing import BUDGET_DATASET_SIZES, QueryBudgetTestMixin
 
 from .models import Status
 
@@ -161,3 +167,62 @@ class StatusTest(TestCase):
 
         self.assertTrue(Status.objects.filter(id=self.status.id).exists())
         self.assertEqual(Status.objects.count(), 2)
+
+    def test_status_list_shows_usage(self):
+        Task.objects.create(
+            name="Task",
+            description="Task description",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+        self.client.login(username="TestUser", password="password123")
+        # Первый запрос кладёт пользователя сессии в кэш
+        self.client.get(self.statuses_url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.statuses_url)
+        self.assertContains(response, "Используется (1 задача)")
+        self.assertNotContains(response, self.delete_url)
+        self.assertContains(response, reverse_lazy(
+            "statuses:statuses_delete", kwargs={"pk": self.status2.id}))
+
+        for number in range(5):
+            Status.objects.create(name=f"Status {number}")
+        with CaptureQueriesContext(connection) as more_rows:
+            self.client.get(self.statuses_url)
+        self.assertEqual(len(more_rows), len(context))
+
+
+class StatusQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="TestUser")
+        self.status = Status.objects.create(name="Status")
+        self.client.force_login(self.user)
+
+    def populate(self, size):
+        tasks = Task.objects.bulk_create(
+            Task(name=f"Task {number}", status=self.status, owner=self.user,
+                 executor=self.user)
+            for number in range(self.status.tasks.count(), size)
+        )
+        change_counts(Status, {self.status.pk: len(tasks)})
+
+    def test_status_delete(self):
+        self.assertQueryBudget(
+            reverse("statuses:statuses_delete", kwargs={"pk": self.status.pk}),
+            self.populate)
+
+    def test_status_in_use_not_deleted(self):
+        self.assertQueryBudget(
+            reverse("statuses:statuses_delete", kwargs={"pk": self.status.pk}),
+            self.populate, method="POST")
+
+    def test_unused_status_deleted(self):
+        unused = Status.objects.create(name="Unused")
+
+        # Удалить можно один раз: проверяем на самом большом наборе
+        self.assertQueryBudget(
+            reverse("statuses:statuses_delete", kwargs={"pk": unused.pk}),
+            self.populate, sizes=BUDGET_DATASET_SIZES[-1:], method="POST")
+        self.assertFalse(Status.objects.filter(pk=unused.pk).exists())
@@ -5,7 +5,7 @@ from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
-from task_manager.mixins import CustomLoginRequiredMixin
+from task_manager.mixins import CustomLoginRequiredMixin, ReplicaReadMixin
 
 from .forms import StatusForm
 from .models import Status
@@ -13,8 +13,9 @@ from .models import Status
 SUCCESS_URL = "statuses:statuses_index"
 
 
-class StatusesIndexView(CustomLoginRequiredMixin, ListView):
+class StatusesIndexView(CustomLoginRequiredMixin, ReplicaReadMixin, ListView):
     model = Status
+    replica_models = (Status,)
     template_name = "statuses/statuses_index.html"
     context_object_name = "statuses"
 
@@ -58,6 +59,8 @@ class StatusesDeleteView(
     success_delete_message = _("The status was deleted successfully")
     error_delete_message = _("Cannot delete status because it is in use.")
     form_title = _("Delete status")
+    # POST ещё раз читает объект, сверяет число задач и удаляет
+    max_queries = {"GET": 3, "POST": 7}
 
     def form_valid(self, form):
         self.object = self.get_object()
@@ -0,0 +1,168 @@
+from collections import defaultdict
+
+from django.core.paginator import InvalidPage
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+from django.views.generic import View
+
+from task_manager.mixins import JsonLoginRequiredMixin
+from task_manager.pagination import KeysetPaginator
+
+from .forms import TaskFilter
+from .models import Task
+from .search import ranked_ordering
+
+USER_COLUMNS = ("id", "username", "first_name", "last_name")
+
+# Поле ответа -> колонки values(); связи джойнятся, только если их просят
+FIELDS = {
+    "id": ("id",),
+    "name": ("name",),
+    "description": ("description",),
+    "status": ("status_id", "status__name"),
+    "owner": tuple(f"owner__{column}" for column in USER_COLUMNS),
+    "executor": tuple(f"executor__{column}" for column in USER_COLUMNS),
+    "labels": (),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+}
+DEFAULT_FIELDS = tuple(FIELDS)
+ORDERING = ("-created_at", "-id")
+
+
+class ApiError(Exception):
+    def __init__(self, detail, status=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status = status
+
+
+def parse_fields(request):
+    value = request.GET.get("fields")
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in value.split(",") if field.strip()
+    ))
+    unknown = [field for field in fields if field not in FIELDS]
+    if unknown:
+        raise ApiError({"fields": [
+            str(_("Unknown field: %(field)s") % {"field": field})
+            for field in unknown
+        ]})
+    return fields
+
+
+def columns_for(fields, extra=()):
+    columns = dict.fromkeys(extra)
+    for field in fields:
+        columns.update(dict.fromkeys(FIELDS[field]))
+    return tuple(columns)
+
+
+def serialize(rows, fields):
+    labels = load_labels(rows) if "labels" in fields else {}
+    results = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field == "status":
+                item[field] = {
+                    "id": row["status_id"], "name": row["status__name"],
+                }
+            elif field in ("owner", "executor"):
+                item[field] = {
+                    column: row[f"{field}__{column}"]
+                    for column in USER_COLUMNS
+                }
+            elif field == "labels":
+                item[field] = labels.get(row["id"], [])
+            else:
+                item[field] = row[field]
+        results.append(item)
+    return results
+
+
+def load_labels(rows):
+    # Метки страницы одним запросом к таблице связей
+    labels = defaultdict(list)
+    links = (
+        Task.labels.through.objects
+        .filter(task_id__in=[row["id"] for row in rows])
+        .order_by("label_id")
+        .values_list("task_id", "label_id", "label__name")
+    )
+    for task_id, label_id, name in links:
+        labels[task_id].append({"id": label_id, "name": name})
+    return labels
+
+
+class TaskApiView(JsonLoginRequiredMixin, View):
+    filterset_class = TaskFilter
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return JsonResponse(self.get_data(request, *args, **kwargs))
+        except ApiError as e:
+            return JsonResponse({"errors": e.detail}, status=e.status)
+
+
+class TaskApiListView(TaskApiView):
+    paginate_by = 50
+    max_paginate_by = 200
+
+    def get_data(self, request):
+        fields = parse_fields(request)
+        filterset = self.filterset_class(
+            request.GET or None,
+            queryset=Task.objects.all(),
+            request=request,
+        )
+        if not filterset.is_valid():
+            raise ApiError(filterset.errors.get_json_data())
+        queryset = filterset.qs
+
+        ordering = ranked_ordering(queryset, ORDERING)
+        keys = [name.lstrip("-") for name in ordering]
+        paginator = KeysetPaginator(
+            queryset.values(*columns_for(fields, extra=keys)),
+            self.get_paginate_by(request),
+            ordering=ordering,
+        )
+        try:
+            page = paginator.page(request.GET.get("cursor"))
+        except InvalidPage as e:
+            raise ApiError({"cursor": [str(e)]})
+
+        return {
+            "results": serialize(page.object_list, fields),
+            "next": self.page_url(request, page.next_cursor),
+            "previous": self.page_url(request, page.previous_cursor),
+        }
+
+    def get_paginate_by(self, request):
+        try:
+            limit = int(request.GET.get("limit", self.paginate_by))
+        except ValueError:
+            raise ApiError({"limit": [str(_("Enter a whole number."))]})
+        return min(max(limit, 1), self.max_paginate_by)
+
+    def page_url(self, request, cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query["cursor"] = cursor
+        return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+
+
+class TaskApiDetailView(TaskApiView):
+    message_not_found = _("Task not found.")
+
+    def get_data(self, request, pk):
+        fields = parse_fields(request)
+        rows = list(
+            Task.objects.filter(pk=pk).values(*columns_for(fields, ("id",)))
+        )
+        if not rows:
+            raise ApiError(str(self.message_not_found), status=404)
+        return serialize(rows, fields)[0]
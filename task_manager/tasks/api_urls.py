@@ -0,0 +1,8 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path('', api.TaskApiListView.as_view(), name='tasks_list'),
+    path('<int:pk>/', api.TaskApiDetailView.as_view(), name='tasks_detail'),
+]
@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import urls, views
+
+app_name = urls.app_name
+
+# Список и карточка задач на async ORM, остальное как в urls.py
+ASYNC_VIEWS = {
+    "tasks_index": views.AsyncTaskListView,
+    "tasks_detail": views.AsyncTaskDetailView,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(),
+         name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in urls.urlpatterns
+]
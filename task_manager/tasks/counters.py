@@ -0,0 +1,37 @@
+from collections import Counter, defaultdict
+
+from django.db.models import F
+
+from task_manager.labels.models import Label
+from task_manager.statuses.models import Status
+
+
+def change_counts(model, deltas):
+    """
+    Add ``deltas`` (``{pk: change}``) to ``model.task_count``.
+
+    Rows with the same change share one UPDATE, and the addition happens
+    in the database, so concurrent writers do not lose each other's
+    changes. Call it inside the transaction that changes the tasks.
+    """
+    groups = defaultdict(list)
+    for pk, delta in deltas.items():
+        if pk is not None and delta:
+            groups[delta].append(pk)
+    for delta, pks in groups.items():
+        model.objects.filter(pk__in=pks).update(
+            task_count=F("task_count") + delta)
+
+
+def count_added(tasks, links=()):
+    """Count new ``tasks`` and ``(task_id, label_id)`` links."""
+    change_counts(Status, Counter(task.status_id for task in tasks))
+    change_counts(Label, Counter(label_id for _, label_id in links))
+
+
+def count_removed_links(links):
+    change_counts(Label, {
+        label_id: -count
+        for label_id, count in Counter(
+            label_id for _, label_id in links).items()
+    })
@@ -0,0 +1,106 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Aggregate, CharField, OuterRef, Subquery, Value
+
+from .models import Task
+
+LABEL_SEPARATOR = ";"
+CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+COLUMNS = (
+    ("id", "id"),
+    ("name", "name"),
+    ("description", "description"),
+    ("status", "status__name"),
+    ("owner", "owner__username"),
+    ("executor", "executor__username"),
+    ("labels", "label_names"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+)
+FIELD_NAMES = tuple(name for name, _ in COLUMNS)
+LABELS_INDEX = FIELD_NAMES.index("labels")
+
+
+class GroupConcat(Aggregate):
+    function = "GROUP_CONCAT"
+    output_field = CharField()
+
+    def __init__(self, expression, delimiter, **extra):
+        super().__init__(expression, Value(delimiter), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function="STRING_AGG", **extra_context
+        )
+
+
+def label_names():
+    # Подзапрос, а не JOIN: фильтр по метке не должен урезать список меток
+    through = Task.labels.through
+    names = (
+        through.objects
+        .filter(task_id=OuterRef("pk"))
+        .values("task_id")
+        .annotate(names=GroupConcat("label__name", LABEL_SEPARATOR))
+        .values("names")
+    )
+    return Subquery(names, output_field=CharField())
+
+
+def export_rows(queryset):
+    """Yield task rows as tuples ordered like FIELD_NAMES."""
+    rows = (
+        queryset
+        .annotate(label_names=label_names())
+        .order_by("id")
+        .values_list(*(lookup for _, lookup in COLUMNS))
+    )
+    yield from rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def buffered(lines):
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def stream_csv(queryset):
+    writer = csv.writer(Echo())
+    # Заголовок уходит клиенту сразу, до первого запроса к базе
+    yield writer.writerow(FIELD_NAMES)
+    yield from buffered(
+        writer.writerow(row) for row in export_rows(queryset)
+    )
+
+
+def stream_jsonl(queryset):
+    def lines():
+        for row in export_rows(queryset):
+            record = dict(zip(FIELD_NAMES, row))
+            labels = row[LABELS_INDEX]
+            record["labels"] = labels.split(LABEL_SEPARATOR) if labels else []
+            yield json.dumps(
+                record, cls=DjangoJSONEncoder, ensure_ascii=False
+            ) + "\n"
+    yield from buffered(lines())
+
+
+FORMATS = {
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+    "jsonl": (stream_jsonl, "application/x-ndjson; charset=utf-8"),
+}
@@ -1,21 +1,113 @@
+from collections import Counter
+
 import django_filters
 from django import forms
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.models import ModelChoiceIterator, ModelChoiceIteratorValue
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from task_manager.cache import (
+    acached_choices,
+    bump_version,
+    cached_choices,
+    model_namespace,
+)
 from task_manager.labels.models import Label
 from task_manager.statuses.models import Status
 
+from .counters import change_counts, count_added, count_removed_links
 from .models import Task
+from .search import search_tasks
 
 User = get_user_model()
 
 
-class UserModelChoiceField(forms.ModelChoiceField):
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    """
+    Serve choices from the cache instead of querying on every render.
+
+    Only unfiltered querysets are cached: the entry is invalidated when a
+    row of the model is saved or deleted (see tasks.signals).
+    """
+
+    def get_choices(self):
+        if self.queryset.query.has_filters():
+            return [self.choice(obj) for obj in self.queryset]
+        return self._from_cache(
+            cached_choices(self.queryset, self._cached_choice, self._key()))
+
+    async def aload(self):
+        """Async ``list(self)``, for views on the async ORM."""
+        choices = []
+        if self.field.empty_label is not None:
+            choices.append(("", self.field.empty_label))
+        if self.queryset.query.has_filters():
+            choices += [
+                self.choice(obj) async for obj in self.queryset.aiterator()
+            ]
+        else:
+            choices += self._from_cache(await acached_choices(
+                self.queryset, self._cached_choice, self._key()))
+        return choices
+
+    def _key(self):
+        field_class = type(self.field)
+        return f"{field_class.__module__}.{field_class.__qualname__}"
+
+    def _cached_choice(self, obj):
+        return (
+            self.field.prepare_value(obj),
+            self.field.label_from_instance(obj),
+        )
+
+    def _from_cache(self, choices):
+        return [
+            (ModelChoiceIteratorValue(value, None), label)
+            for value, label in choices
+        ]
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from self.get_choices()
+
+    def __len__(self):
+        empty = 1 if self.field.empty_label is not None else 0
+        return len(self.get_choices()) + empty
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.get_choices())
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    iterator = CachedModelChoiceIterator
+
+
+class CachedModelMultipleChoiceField(forms.ModelMultipleChoiceField):
+    iterator = CachedModelChoiceIterator
+
+
+class UserModelChoiceField(CachedModelChoiceField):
     def label_from_instance(self, obj):
         return obj.get_full_name()
 
 
+async def aload_choices(*instances):
+    """Load the choices of every cached select of the forms."""
+    fields = [
+        field
+        for form in instances
+        for field in form.fields.values()
+        if isinstance(field, forms.ModelChoiceField)
+        and issubclass(field.iterator, CachedModelChoiceIterator)
+    ]
+    for field in fields:
+        field.choices = await field.iterator(field).aload()
+
+
 class TaskForm(forms.ModelForm):
     name = forms.CharField(
         label=_("Name"),
@@ -25,7 +117,7 @@ class TaskForm(forms.ModelForm):
         label=_("Description"),
         widget=forms.Textarea(attrs={"placeholder": _("Description")})
     )
-    status = forms.ModelChoiceField(
+    status = CachedModelChoiceField(
         label=_("Status"),
         queryset=Status.objects.all(),
         empty_label=None,
@@ -37,7 +129,7 @@ class TaskForm(forms.ModelForm):
         empty_label=None,
         widget=forms.Select()
     )
-    labels = forms.ModelMultipleChoiceField(
+    labels = CachedModelMultipleChoiceField(
         queryset=Label.objects.all(),
         label=_("Labels"),
         required=False,
@@ -49,17 +141,32 @@ class TaskForm(forms.ModelForm):
         fields = ["name", "description", "status", "executor", "labels"]
 
 
+class CachedModelChoiceFilter(django_filters.ModelChoiceFilter):
+    field_class = CachedModelChoiceField
+
+
 class UserModelChoiceFilter(django_filters.ModelChoiceFilter):
     field_class = UserModelChoiceField
 
 
 class TaskFilter(django_filters.FilterSet):
+    q = django_filters.CharFilter(
+        label=_("Search"),
+        method="filter_search",
+        widget=forms.TextInput(
+            attrs={"placeholder": _("Name or description")}
+        ),
+    )
+    status = CachedModelChoiceFilter(
+        queryset=Status.objects.all(),
+        label=_('Status'),
+        required=False)
     executor = UserModelChoiceFilter(
         queryset=User.objects.all(),
         label=_('Executor'),
         required=False
     )
-    labels = django_filters.ModelChoiceFilter(
+    labels = CachedModelChoiceFilter(
         queryset=Label.objects.all(),
         label=_('Label'),
         required=False)
@@ -76,6 +183,162 @@ class TaskFilter(django_filters.FilterSet):
         # Если False, возвращаем все задачи без фильтрации по владельцу.
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        return search_tasks(queryset, value)
+
     class Meta:
         model = Task
-        fields = ['status', 'executor', 'labels', 'my_tasks']
+        fields = ['q', 'status', 'executor', 'labels', 'my_tasks']
+
+
+class IdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        "invalid": _("Enter a list of identifiers."),
+    }
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({int(item) for item in value})
+        except (TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages["invalid"], code="invalid")
+
+
+class SharedOptionsMixin:
+    """
+    Render a select without options: the page copies them from the select
+    named ``source`` of the filter form, so a list of thousands of users
+    is rendered once, not twice.
+    """
+
+    def __init__(self, source, attrs=None):
+        super().__init__({**(attrs or {}), "data-options-from": source})
+
+    def optgroups(self, name, value, attrs=None):
+        return []
+
+
+class SharedOptionsSelect(SharedOptionsMixin, forms.Select):
+    pass
+
+
+class SharedOptionsSelectMultiple(SharedOptionsMixin, forms.SelectMultiple):
+    pass
+
+
+class TaskBulkActionForm(forms.Form):
+    SET_STATUS = "set_status"
+    SET_EXECUTOR = "set_executor"
+    ADD_LABELS = "add_labels"
+    REMOVE_LABELS = "remove_labels"
+    ACTIONS = [
+        (SET_STATUS, _("Change status")),
+        (SET_EXECUTOR, _("Reassign executor")),
+        (ADD_LABELS, _("Add labels")),
+        (REMOVE_LABELS, _("Remove labels")),
+    ]
+    REQUIRED_FIELDS = {
+        SET_STATUS: "status",
+        SET_EXECUTOR: "executor",
+        ADD_LABELS: "labels",
+        REMOVE_LABELS: "labels",
+    }
+
+    tasks = IdListField(
+        error_messages={"required": _("Select at least one task.")}
+    )
+    action = forms.ChoiceField(label=_("Action"), choices=ACTIONS)
+    # Варианты выбора нужны только для проверки отправленной формы
+    status = CachedModelChoiceField(
+        queryset=Status.objects.all(),
+        label=_("Status"),
+        required=False,
+        widget=SharedOptionsSelect("status"),
+    )
+    executor = UserModelChoiceField(
+        queryset=User.objects.all(),
+        label=_("Executor"),
+        required=False,
+        widget=SharedOptionsSelect("executor"),
+    )
+    labels = CachedModelMultipleChoiceField(
+        queryset=Label.objects.all(),
+        label=_("Labels"),
+        required=False,
+        widget=SharedOptionsSelectMultiple("labels"),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        field = self.REQUIRED_FIELDS.get(cleaned_data.get("action"))
+        if field and not cleaned_data.get(field):
+            self.add_error(field, self.fields[field].error_messages["required"])
+        return cleaned_data
+
+    def apply(self, user):
+        """
+        Apply the action to the selected tasks owned by ``user``.
+
+        Every action is one UPDATE or one bulk insert/delete on the labels
+        table. Returns the number of tasks changed.
+        """
+        action = self.cleaned_data["action"]
+        # Как и удалять, менять задачи пачкой может только их автор
+        tasks = Task.objects.filter(
+            id__in=self.cleaned_data["tasks"], owner=user)
+        now = timezone.now()
+
+        with transaction.atomic():
+            # update() и bulk_create не шлют сигналов: списки задач
+            # сбрасываем сами
+            transaction.on_commit(
+                lambda: bump_version(model_namespace(Task)))
+            if action == self.SET_STATUS:
+                status = self.cleaned_data["status"]
+                old_statuses = Counter(
+                    tasks.select_for_update()
+                    .values_list("status_id", flat=True))
+                count = tasks.update(status=status, updated_at=now)
+                deltas = Counter({status.id: count})
+                deltas.subtract(old_statuses)
+                change_counts(Status, deltas)
+                return count
+            if action == self.SET_EXECUTOR:
+                return tasks.update(
+                    executor=self.cleaned_data["executor"], updated_at=now)
+
+            # Задачи блокируются до чтения их связей: иначе параллельный
+            # запрос добавит ту же связь, а счётчик вырастет дважды.
+            # Порядок по id - чтобы два таких запроса не ждали друг друга
+            task_ids = list(
+                tasks.select_for_update().order_by("id")
+                .values_list("id", flat=True))
+            labels = self.cleaned_data["labels"]
+            through = Task.labels.through
+            # Счётчики меток меняются только на реально добавленные или
+            # удалённые связи
+            links = through.objects.filter(
+                task_id__in=task_ids, label__in=labels)
+            existing = set(links.values_list("task_id", "label_id"))
+            if action == self.ADD_LABELS:
+                added = [
+                    (task_id, label.id)
+                    for task_id in task_ids
+                    for label in labels
+                    if (task_id, label.id) not in existing
+                ]
+                through.objects.bulk_create(
+                    [
+                        through(task_id=task_id, label_id=label_id)
+                        for task_id, label_id in added
+                    ],
+                    ignore_conflicts=True,
+                )
+                count_added((), added)
+            else:
+                links.delete()
+                count_removed_links(existing)
+            return Task.objects.filter(id__in=task_ids).update(updated_at=now)
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from http.cookies import SimpleCookie
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from task_manager.benchmarks import (
+    benchmark_user,
+    percentile,
+    testserver_settings,
+)
+from task_manager.seeding import seed
+from task_manager.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency of the task list and detail under concurrent "
+        "clients: sync views behind the WSGI handler, one thread per "
+        "client, against the async views of task_manager.asgi_urls behind "
+        "the ASGI handler, one event loop for all clients."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=2000,
+            help="Requests per path, split between the list and the detail.",
+        )
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument(
+            "--seed-tasks", type=int, default=0,
+            help="Generate this many tasks before measuring.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+        if options["seed_tasks"]:
+            counts = seed(tasks=options["seed_tasks"])
+            self.stdout.write(f"Seeded: {counts}")
+        task = Task.objects.order_by("-created_at").first()
+        if task is None:
+            raise CommandError("There are no tasks, use --seed-tasks.")
+
+        with benchmark_user() as user:
+            client = Client()
+            client.force_login(user)
+            cookies = {
+                name: morsel.value for name, morsel in client.cookies.items()
+            }
+            try:
+                with testserver_settings():
+                    results = [
+                        ("WSGI, sync views", self.measure(
+                            "task_manager.urls", self.run_wsgi,
+                            task, cookies, options)),
+                        ("ASGI, async views", self.measure(
+                            "task_manager.asgi_urls",
+                            async_to_sync(self.run_asgi),
+                            task, cookies, options)),
+                    ]
+            finally:
+                client.logout()
+        self.report(results, options)
+
+    def measure(self, urlconf, run, task, cookies, options):
+        with override_settings(ROOT_URLCONF=urlconf):
+            urls = [
+                ("tasks_index", reverse("tasks:tasks_index")),
+                ("tasks_detail", reverse("tasks:tasks_detail", args=[task.pk])),
+            ]
+            jobs = [
+                urls[number % len(urls)]
+                for number in range(options["requests"])
+            ]
+            return run(urls, jobs, cookies, options)
+
+    def run_wsgi(self, urls, jobs, cookies, options):
+        # Первые запросы заполняют кэши, их время не учитывается
+        warmup = self.make_client(Client, cookies)
+        for name, url in urls:
+            self.check(name, warmup.get(url))
+
+        queue = deque(jobs)
+        latencies = {name: [] for name, _ in urls}
+        errors = []
+
+        def client():
+            browser = self.make_client(Client, cookies)
+            try:
+                while queue and not errors:
+                    try:
+                        name, url = queue.popleft()
+                    except IndexError:
+                        break
+                    start = time.perf_counter()
+                    response = browser.get(url)
+                    latencies[name].append(time.perf_counter() - start)
+                    self.check(name, response)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                # У каждого потока своё соединение с базой
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=client)
+            for _ in range(options["concurrency"])
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        return elapsed, latencies
+
+    async def run_asgi(self, urls, jobs, cookies, options):
+        async def request(browser, name, url):
+            # Как ASGIHandler: синхронный код запроса идёт в своём потоке
+            # со своим соединением, которое закрывается после ответа
+            async with ThreadSensitiveContext():
+                try:
+                    self.check(name, await browser.get(url))
+                finally:
+                    await sync_to_async(connections.close_all)()
+
+        warmup = self.make_client(AsyncClient, cookies)
+        for name, url in urls:
+            await request(warmup, name, url)
+
+        queue = deque(jobs)
+        latencies = {name: [] for name, _ in urls}
+
+        async def client():
+            browser = self.make_client(AsyncClient, cookies)
+            while queue:
+                name, url = queue.popleft()
+                start = time.perf_counter()
+                await request(browser, name, url)
+                latencies[name].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(client() for _ in range(options["concurrency"])))
+        return time.perf_counter() - start, latencies
+
+    def make_client(self, client_class, cookies):
+        client = client_class()
+        client.cookies = SimpleCookie(cookies)
+        return client
+
+    def check(self, name, response):
+        if response.status_code != 200:
+            raise CommandError(
+                f"{name} answered with status {response.status_code}.")
+
+    def report(self, results, options):
+        self.stdout.write(
+            f"Requests per path: {options['requests']}, "
+            f"concurrent clients: {options['concurrency']}"
+        )
+        for title, (elapsed, latencies) in results:
+            self.stdout.write(
+                f"{title}: {options['requests'] / elapsed:.1f} requests/s")
+            for name, values in latencies.items():
+                values = sorted(values)
+                self.stdout.write(
+                    f"  {name}: p50 {percentile(values, 50) * 1000:.1f} ms, "
+                    f"p99 {percentile(values, 99) * 1000:.1f} ms"
+                )
@@ -0,0 +1,106 @@
+import statistics
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from task_manager.seeding import seed
+from task_manager.tasks.forms import TaskFilter
+from task_manager.tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = (
+        "Print query plans and timings of the task list for the common "
+        "TaskFilter combinations, optionally seeding data first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed-tasks", type=int, default=0,
+            help="Generate this many tasks before measuring.",
+        )
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--statuses", type=int, default=5)
+        parser.add_argument("--labels", type=int, default=50)
+        parser.add_argument(
+            "--repeat", type=int, default=5,
+            help="How many times every query is timed.",
+        )
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument(
+            "--no-analyze", action="store_true",
+            help="Use plain EXPLAIN instead of EXPLAIN ANALYZE on PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed_tasks"]:
+            counts = seed(
+                users=options["users"],
+                statuses=options["statuses"],
+                labels=options["labels"],
+                tasks=options["seed_tasks"],
+            )
+            self.stdout.write(f"Seeded: {counts}")
+
+        sample = Task.objects.order_by("-created_at").first()
+        if sample is None:
+            raise CommandError("There are no tasks, use --seed-tasks.")
+        label = sample.labels.first()
+
+        self.stdout.write(
+            f"Database: {connection.vendor}, "
+            f"tasks: {Task.objects.count()}"
+        )
+        for title, data in self.get_combinations(sample, label):
+            queryset = self.get_queryset(data, sample.owner, options)
+            self.report(title, queryset, options)
+
+    def get_combinations(self, sample, label):
+        combinations = [
+            ("no filter", {}),
+            ("status", {"status": sample.status_id}),
+            (
+                "status + executor",
+                {"status": sample.status_id, "executor": sample.executor_id},
+            ),
+            ("executor", {"executor": sample.executor_id}),
+            ("only my tasks", {"my_tasks": "on"}),
+        ]
+        if label is not None:
+            combinations.append(("label", {"labels": label.pk}))
+        return combinations
+
+    def get_queryset(self, data, user, options):
+        # Тот же запрос, что строит TaskListView для первой страницы
+        filterset = TaskFilter(
+            data,
+            queryset=Task.objects.select_related(
+                "status", "owner", "executor"
+            ).defer("description"),
+            request=SimpleNamespace(user=user),
+        )
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+        return filterset.qs.order_by("-created_at", "-id")[
+            :options["page_size"]
+        ]
+
+    def report(self, title, queryset, options):
+        explain_options = {}
+        if connection.vendor == "postgresql" and not options["no_analyze"]:
+            explain_options = {"analyze": True, "buffers": True}
+
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {title}"))
+        self.stdout.write(queryset.explain(**explain_options))
+        self.stdout.write(
+            f"min {min(timings):.2f} ms, "
+            f"median {statistics.median(timings):.2f} ms"
+        )
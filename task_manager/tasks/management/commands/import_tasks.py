@@ -0,0 +1,163 @@
+import csv
+import json
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from task_manager.cache import bump_version, model_namespace
+from task_manager.labels.models import Label
+from task_manager.statuses.models import Status
+from task_manager.tasks.counters import count_added
+from task_manager.tasks.export import LABEL_SEPARATOR
+from task_manager.tasks.models import Task
+from task_manager.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tasks from a CSV or JSON Lines file in the format produced "
+        "by the task export. Statuses, users and labels are referenced by "
+        "name (username for users)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help='File to import, "-" for stdin.')
+        parser.add_argument(
+            "--format", choices=("csv", "jsonl"),
+            help="File format, guessed from the extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--owner",
+            help="Username used for rows without an owner.",
+        )
+        parser.add_argument(
+            "--create-missing", action="store_true",
+            help="Create unknown statuses and labels instead of failing.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        file_format = options["format"] or self.guess_format(options["path"])
+
+        self.create_missing = options["create_missing"]
+        # Все справочники целиком в памяти: одна выборка вместо запроса
+        # на каждую строку файла
+        self.statuses = dict(Status.objects.values_list("name", "id"))
+        self.labels = dict(Label.objects.values_list("name", "id"))
+        self.users = dict(User.objects.values_list("username", "id"))
+        self.default_owner = options["owner"]
+        if self.default_owner:
+            self.lookup(self.users, self.default_owner, "user", None)
+
+        imported = 0
+        with self.open(options["path"]) as stream:
+            records = enumerate(self.read(stream, file_format), start=1)
+            while batch := list(islice(records, options["batch_size"])):
+                imported += self.import_batch(batch, imported)
+                self.stdout.write(f"Imported {imported} tasks")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {imported} tasks"))
+
+    def guess_format(self, path):
+        if path.endswith(".jsonl"):
+            return "jsonl"
+        if path.endswith(".csv"):
+            return "csv"
+        raise CommandError("Cannot guess the file format, use --format.")
+
+    def open(self, path):
+        if path == "-":
+            return open(sys.stdin.fileno(), encoding="utf-8", closefd=False)
+        try:
+            return open(path, encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError(e)
+
+    def read(self, stream, file_format):
+        if file_format == "csv":
+            yield from csv.DictReader(stream)
+            return
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                raise CommandError(f"Line {number}: {e}")
+
+    def import_batch(self, batch, imported):
+        tasks, task_labels = [], []
+        for number, record in batch:
+            task, label_ids = self.build(number, record)
+            tasks.append(task)
+            task_labels.append(label_ids)
+
+        try:
+            with transaction.atomic():
+                Task.objects.bulk_create(tasks)
+                links = [
+                    (task.pk, label_id)
+                    for task, label_ids in zip(tasks, task_labels)
+                    for label_id in label_ids
+                ]
+                Task.labels.through.objects.bulk_create([
+                    Task.labels.through(task_id=task_id, label_id=label_id)
+                    for task_id, label_id in links
+                ])
+                # bulk_create обходит save(), счётчики и версию списков
+                # задач правим сами
+                count_added(tasks, links)
+                transaction.on_commit(
+                    lambda: bump_version(model_namespace(Task)))
+        except DatabaseError as e:
+            first, last = batch[0][0], batch[-1][0]
+            raise CommandError(
+                f"Records {first}-{last} were not imported ({e}). "
+                f"{imported} tasks were imported before them."
+            )
+        return len(tasks)
+
+    def build(self, number, record):
+        labels = record.get("labels") or []
+        if isinstance(labels, str):
+            labels = labels.split(LABEL_SEPARATOR)
+        owner = record.get("owner") or self.default_owner
+        if not owner:
+            raise CommandError(f"Record {number}: owner is required.")
+
+        task = Task(
+            name=self.required(record, "name", number),
+            description=record.get("description") or "",
+            status_id=self.lookup(
+                self.statuses, self.required(record, "status", number),
+                "status", number),
+            owner_id=self.lookup(self.users, owner, "user", number),
+            executor_id=self.lookup(
+                self.users, self.required(record, "executor", number),
+                "user", number),
+        )
+        label_ids = {
+            self.lookup(self.labels, name.strip(), "label", number)
+            for name in labels if name.strip()
+        }
+        return task, label_ids
+
+    def required(self, record, field, number):
+        value = record.get(field)
+        if not value:
+            raise CommandError(f"Record {number}: {field} is required.")
+        return value
+
+    def lookup(self, mapping, name, kind, number):
+        if name in mapping:
+            return mapping[name]
+        if self.create_missing and kind in ("status", "label"):
+            model = Status if kind == "status" else Label
+            mapping[name] = model.objects.create(name=name).pk
+            return mapping[name]
+        where = f"Record {number}" if number else "--owner"
+        raise CommandError(f"{where}: unknown {kind} {name!r}.")
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 20:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labels', '0001_initial'),
+        ('statuses', '0001_initial'),
+        ('tasks', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='task_status_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'executor', '-created_at', '-id'], name='task_status_executor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='task_owner_recent_idx'),
+        ),
+        # Фильтр по метке идёт от label_id к task_id, а уникальный индекс
+        # автоматической таблицы связей начинается с task_id.
+        migrations.RunSQL(
+            sql='CREATE INDEX tasks_task_labels_label_task_idx '
+                'ON tasks_task_labels (label_id, task_id)',
+            reverse_sql='DROP INDEX tasks_task_labels_label_task_idx',
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_tasks(apps, schema_editor):
+    Task = apps.get_model("tasks", "Task")
+    Status = apps.get_model("statuses", "Status")
+    Label = apps.get_model("labels", "Label")
+    TaskLabel = Task.labels.through
+
+    def counted(queryset, field):
+        counts = (
+            queryset
+            .filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return Coalesce(Subquery(counts), 0)
+
+    Status.objects.update(task_count=counted(Task.objects, "status"))
+    Label.objects.update(task_count=counted(TaskLabel.objects, "label"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0002_task_count"),
+        ("statuses", "0002_task_count"),
+        ("tasks", "0004_task_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(count_tasks, migrations.RunPython.noop),
+    ]
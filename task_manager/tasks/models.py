@@ -1,10 +1,43 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, router, transaction
 from django.utils.translation import gettext_lazy as _
 
 from task_manager.labels.models import Label
 from task_manager.statuses.models import Status
 from task_manager.users.models import User
 
+from .counters import change_counts, count_removed_links
+
+
+class TaskQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the tasks and take them off the counters of their statuses
+        and labels, like Task.delete() does for one task. The admin's
+        "Delete selected" goes through here.
+        """
+        with transaction.atomic(using=self.db):
+            # Порядок по id - чтобы два таких удаления не ждали друг друга
+            rows = list(
+                self.select_for_update().order_by("pk")
+                .values_list("pk", "status_id"))
+            task_ids = [task_id for task_id, _ in rows]
+            # Связи с метками удаляются каскадом, без сигнала m2m_changed
+            links = list(
+                Task.labels.through.objects.using(self.db)
+                .filter(task_id__in=task_ids)
+                .values_list("task_id", "label_id"))
+            # Удаляются только заблокированные и посчитанные строки
+            result = super(TaskQuerySet, self.filter(pk__in=task_ids)).delete()
+            change_counts(Status, {
+                status_id: -count
+                for status_id, count in Counter(
+                    status_id for _, status_id in rows).items()
+            })
+            count_removed_links(links)
+        return result
+
 
 class Task(models.Model):
     name = models.CharField(
@@ -43,5 +76,61 @@ class Task(models.Model):
         auto_now=True,
         verbose_name=_("Updated at"))
 
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        # Индексы повторяют частые комбинации TaskFilter и порядок списка
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="task_recent_idx"),
+            models.Index(
+                fields=["status", "-created_at", "-id"],
+                name="task_status_recent_idx"),
+            models.Index(
+                fields=["status", "executor", "-created_at", "-id"],
+                name="task_status_executor_idx"),
+            models.Index(
+                fields=["owner", "-created_at", "-id"],
+                name="task_owner_recent_idx"),
+        ]
+
     def __str__(self):
         return self.name
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"status", "status_id"} & set(
+                update_fields):
+            return super().save(*args, **kwargs)
+
+        using = kwargs.get("using") or router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using):
+            old_status_id = None
+            if not self._state.adding:
+                old_status_id = self._locked_status_id(using)
+            super().save(*args, **kwargs)
+            if old_status_id != self.status_id:
+                change_counts(
+                    Status, {old_status_id: -1, self.status_id: 1})
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get("using") or router.db_for_write(Task, instance=self)
+        with transaction.atomic(using=using):
+            status_id = self._locked_status_id(using)
+            # Связи с метками удаляются каскадом, без сигнала m2m_changed
+            label_ids = list(self.labels.values_list("id", flat=True))
+            result = super().delete(*args, **kwargs)
+            change_counts(Status, {status_id: -1})
+            change_counts(Label, dict.fromkeys(label_ids, -1))
+        return result
+
+    def _locked_status_id(self, using):
+        # Статус берётся из строки под блокировкой, а не из объекта в
+        # памяти: задачу мог изменить другой запрос или массовое действие
+        return (
+            Task.objects.using(using).select_for_update()
+            .filter(pk=self.pk)
+            .values_list("status_id", flat=True)
+            .first()
+        )
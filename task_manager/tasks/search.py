@@ -0,0 +1,107 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+MAX_TERMS = 16
+RANK = "search_rank"
+
+
+def search_terms(query):
+    return re.findall(r"\w+", query or "")[:MAX_TERMS]
+
+
+def search_tasks(queryset, query):
+    """
+    Filter tasks by the words of ``query`` and annotate ``search_rank``.
+
+    Every word is matched as a prefix, all words must be present, and a
+    higher rank means a better match. The full-text index is the FTS5
+    table on SQLite and the ``search_vector`` column on PostgreSQL; both
+    are maintained by the database itself (see migration 0004).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        # Индекс присоединяется один раз, и bm25 берётся из той же строки:
+        # подзапрос на каждую задачу повторял бы MATCH для каждой из них.
+        # Модели у виртуальной таблицы нет, поэтому extra()
+        queryset = queryset.extra(
+            tables=[f"{table}_fts"],
+            where=[f"{table}_fts MATCH %s", f"{table}_fts.rowid = {table}.id"],
+            params=[match],
+        )
+        # Совпадение в названии весит больше, чем в описании
+        return queryset.annotate(**{RANK: RawSQL(
+            f"-bm25({table}_fts, 10.0, 1.0)", (), output_field=FloatField())})
+    elif vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            f"{table}.search_vector @@ to_tsquery('simple', %s)",
+            (tsquery,),
+            output_field=BooleanField(),
+        )
+        # ts_rank возвращает real, а значение из курсора приходит как
+        # float8: без приведения строка на краю страницы не равна себе
+        rank = RawSQL(
+            f"ts_rank({table}.search_vector, to_tsquery('simple', %s))"
+            "::float8",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(name__icontains=term) | Q(description__icontains=term)
+            )
+        return queryset.filter(condition).annotate(
+            **{RANK: Value(0.0, output_field=FloatField())}
+        )
+
+    return queryset.filter(matches).annotate(**{RANK: rank})
+
+
+def ranked_ordering(queryset, ordering):
+    """Put the most relevant tasks first while a search is active."""
+    if RANK in queryset.query.annotations:
+        return (f"-{RANK}", *ordering)
+    return tuple(ordering)
+
+
+@contextmanager
+def deferred_search_index(connection, first_id, table="tasks_task"):
+    """
+    Index the tasks inserted in the block, from ``first_id`` on, with one
+    statement at the end instead of the SQLite trigger firing per row.
+
+    For bulk loads inside a transaction. PostgreSQL computes its generated
+    column during the insert, so there is nothing to defer.
+    """
+    trigger = None
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name, sql FROM sqlite_master "
+                "WHERE type = 'trigger' AND name = %s",
+                [f"{table}_fts_insert"],
+            )
+            trigger = cursor.fetchone()
+            if trigger is not None:
+                cursor.execute(f"DROP TRIGGER {trigger[0]}")
+    yield
+    if trigger is not None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table}_fts(rowid, name, description) "
+                f"SELECT id, name, description FROM {table} WHERE id >= %s",
+                [first_id],
+            )
+            cursor.execute(trigger[1])
@@ -0,0 +1,55 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from task_manager.cache import bump_version, model_namespace
+from task_manager.labels.models import Label
+from task_manager.statuses.models import Status
+from task_manager.users.models import User
+
+from .counters import count_added, count_removed_links
+from .models import Task
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Status)
+@receiver([post_save, post_delete], sender=Label)
+def invalidate_cached_rows(sender, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login, на списки он не влияет
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    bump_version(model_namespace(sender))
+
+
+@receiver([post_save, post_delete], sender=Task)
+def invalidate_task_lists(sender, **kwargs):
+    # ETag списка задач держится на этой версии
+    bump_version(model_namespace(sender))
+
+
+@receiver(m2m_changed, sender=Task.labels.through)
+def invalidate_task_labels(sender, action, **kwargs):
+    # Смена меток не трогает updated_at, но меняет список
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version(model_namespace(Task))
+
+
+@receiver(m2m_changed, sender=Task.labels.through)
+def count_task_labels(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set при добавлении содержит только новые связи, а при удалении -
+    # всё, что попросили убрать, поэтому существующие связи ищем заранее
+    if action == "post_add":
+        if reverse:
+            links = [(task_id, instance.pk) for task_id in pk_set]
+        else:
+            links = [(instance.pk, label_id) for label_id in pk_set]
+        count_added((), links)
+    elif action in ("pre_remove", "pre_clear"):
+        links = sender.objects.filter(
+            **{"label_id" if reverse else "task_id": instance.pk})
+        if pk_set is not None:
+            links = links.filter(
+                **{"task_id__in" if reverse else "label_id__in": pk_set})
+        instance._removed_label_links = list(
+            links.values_list("task_id", "label_id"))
+    elif action in ("post_remove", "post_clear"):
+        count_removed_links(instance.__dict__.pop("_removed_label_links", ()))
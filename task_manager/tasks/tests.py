@@ -1,11 +1,29 @@
+import csv
+import json
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlencode
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
-from django.urls import reverse
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 
 from task_manager.labels.models import Label
+from task_manager.seeding import seed
 from task_manager.statuses.models import Status
+from task_manager.testing import QueryBudgetTestMixin
 
+from .counters import change_counts
 from .models import Task
+from .views import TaskListView
 
 User = get_user_model()
 
@@ -211,3 +229,1164 @@ class TaskModelTests(TestCase):
 
         tasks = response.context["tasks"]
         self.assertNotIn(self.task, tasks)
+
+
+class TaskListQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+            first_name="Test",
+            last_name="User",
+        )
+        self.label = Label.objects.create(name="Test Label")
+        self.tasks_url = reverse("tasks:tasks_index")
+        self.created = 0
+
+    def create_tasks(self, count):
+        for _ in range(count):
+            self.created += 1
+            executor = User.objects.create_user(
+                username=f"executor{self.created}",
+                password="testpassword",
+            )
+            status = Status.objects.create(name=f"Status {self.created}")
+            task = Task.objects.create(
+                name=f"Task {self.created}",
+                description="Description",
+                status=status,
+                owner=self.user,
+                executor=executor,
+            )
+            task.labels.add(self.label)
+
+    def count_list_queries(self):
+        # Первый запрос заполняет кэш вариантов для фильтров
+        self.client.get(self.tasks_url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.tasks_url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.client.force_login(self.user)
+
+        self.create_tasks(1)
+        single_row_queries = self.count_list_queries()
+
+        self.create_tasks(10)
+        many_rows_queries = self.count_list_queries()
+
+        self.assertEqual(single_row_queries, many_rows_queries)
+
+    def test_description_is_deferred(self):
+        self.create_tasks(1)
+        self.client.force_login(self.user)
+        response = self.client.get(self.tasks_url)
+
+        task = response.context["tasks"][0]
+        self.assertIn("description", task.get_deferred_fields())
+
+
+@mock.patch.object(TaskListView, "paginate_by", 2)
+class TaskPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.another_user = User.objects.create_user(
+            username="anotheruser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.status2 = Status.objects.create(name="Done")
+        self.tasks = [
+            Task.objects.create(
+                name=f"Task {number}",
+                description="Description",
+                status=self.status,
+                owner=self.user,
+                executor=self.another_user,
+            )
+            for number in range(5)
+        ]
+        self.tasks_url = reverse("tasks:tasks_index")
+        self.client.force_login(self.user)
+
+    def get_page(self, params):
+        response = self.client.get(self.tasks_url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def test_pages_follow_recency(self):
+        newest_first = list(reversed(self.tasks))
+
+        page = self.get_page({})
+        self.assertEqual(list(page), newest_first[:2])
+        self.assertFalse(page.has_previous())
+
+        page = self.get_page({"cursor": page.next_cursor})
+        self.assertEqual(list(page), newest_first[2:4])
+
+        page = self.get_page({"cursor": page.next_cursor})
+        self.assertEqual(list(page), newest_first[4:])
+        self.assertFalse(page.has_next())
+
+        page = self.get_page({"cursor": page.previous_cursor})
+        self.assertEqual(list(page), newest_first[2:4])
+        self.assertTrue(page.has_next())
+
+        self.assertEqual(page.count, 5)
+        self.assertFalse(page.count_is_estimate)
+
+    def test_cursor_keeps_filters(self):
+        for task in self.tasks[:3]:
+            task.status = self.status2
+            task.save()
+
+        params = {"status": self.status2.id}
+        page = self.get_page(params)
+        self.assertEqual(list(page), [self.tasks[2], self.tasks[1]])
+
+        response = self.client.get(self.tasks_url, params)
+        self.assertContains(response, f"status={self.status2.id}")
+
+        page = self.get_page({**params, "cursor": page.next_cursor})
+        self.assertEqual(list(page), [self.tasks[0]])
+        self.assertEqual(page.count, 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.tasks_url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+
+
+class ExplainTaskFiltersCommandTests(TestCase):
+    def test_reports_every_filter_combination(self):
+        out = StringIO()
+        call_command(
+            "explain_task_filters",
+            seed_tasks=20,
+            users=3,
+            labels=3,
+            repeat=1,
+            stdout=out,
+        )
+        output = out.getvalue()
+
+        self.assertEqual(Task.objects.count(), 20)
+        for title in ("no filter", "status + executor", "only my tasks",
+                      "label"):
+            self.assertIn(f"== {title}", output)
+        self.assertIn("median", output)
+
+
+class TaskSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.by_name = self.create_task(
+            "Login page", "Make the form pretty")
+        self.by_description = self.create_task(
+            "Bug report", "Users cannot login with uppercase names")
+        self.unrelated = self.create_task(
+            "Write docs", "Describe the deployment")
+        self.tasks_url = reverse("tasks:tasks_index")
+        self.client.force_login(self.user)
+
+    def create_task(self, name, description):
+        return Task.objects.create(
+            name=name,
+            description=description,
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(self.tasks_url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.context["page_obj"]
+
+    def test_ranked_prefix_search(self):
+        page = self.search("log")
+        self.assertEqual(list(page), [self.by_name, self.by_description])
+
+    def test_all_words_must_match(self):
+        page = self.search("login uppercase")
+        self.assertEqual(list(page), [self.by_description])
+
+    def test_index_follows_changes(self):
+        self.unrelated.name = "Login docs"
+        self.unrelated.save()
+        self.by_name.delete()
+
+        page = self.search("login")
+        self.assertEqual(
+            set(page), {self.unrelated, self.by_description})
+
+    def test_punctuation_only_query(self):
+        page = self.search('"*()')
+        self.assertEqual(list(page), [])
+
+    def test_cursor_follows_rank(self):
+        with mock.patch.object(TaskListView, "paginate_by", 1):
+            page = self.search("login")
+            self.assertEqual(list(page), [self.by_name])
+
+            page = self.search("login", cursor=page.next_cursor)
+            self.assertEqual(list(page), [self.by_description])
+            self.assertFalse(page.has_next())
+
+    def test_index_is_matched_once_per_query(self):
+        with CaptureQueriesContext(connection) as context:
+            self.search("login")
+
+        searches = [
+            query["sql"] for query in context.captured_queries
+            if "MATCH" in query["sql"]
+        ]
+        self.assertTrue(searches)
+        for sql in searches:
+            self.assertEqual(sql.count("MATCH"), 1, sql)
+
+
+class TaskChoicesCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+            first_name="Test",
+            last_name="User",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.label = Label.objects.create(name="Test Label")
+        self.client.force_login(self.user)
+
+    def choice_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query["sql"] for query in context.captured_queries
+            if 'FROM "statuses_status"' in query["sql"]
+            or 'FROM "labels_label"' in query["sql"]
+            or query["sql"].endswith('FROM "users_user"')
+        ]
+
+    def test_steady_state_renders_without_choice_queries(self):
+        for url in (reverse("tasks:tasks_create"),
+                    reverse("tasks:tasks_index")):
+            with self.subTest(url=url):
+                self.choice_queries(url)
+                self.assertEqual(self.choice_queries(url), [])
+
+    def test_changes_invalidate_choices(self):
+        url = reverse("tasks:tasks_create")
+        self.client.get(url)
+
+        Status.objects.create(name="In Progress")
+        self.label.name = "Renamed Label"
+        self.label.save()
+        User.objects.create_user(
+            username="newuser",
+            password="testpassword",
+            first_name="New",
+            last_name="Executor",
+        )
+
+        response = self.client.get(url)
+        self.assertContains(response, "In Progress")
+        self.assertContains(response, "Renamed Label")
+        self.assertContains(response, "New Executor")
+
+    def test_login_keeps_choices_cached(self):
+        url = reverse("tasks:tasks_create")
+        self.client.get(url)
+        self.client.login(username="testuser", password="testpassword")
+
+        self.assertEqual(self.choice_queries(url), [])
+
+    def test_selected_value_is_rendered(self):
+        task = Task.objects.create(
+            name="Test Task",
+            description="Test Description",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+        task.labels.add(self.label)
+
+        response = self.client.get(
+            reverse("tasks:tasks_update", kwargs={"pk": task.id}))
+        self.assertContains(
+            response, f'<option value="{self.status.id}" selected>')
+        self.assertContains(
+            response, f'<option value="{self.label.id}" selected>')
+
+
+class TaskExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.status2 = Status.objects.create(name="Done")
+        self.label = Label.objects.create(name="Test Label")
+        self.label2 = Label.objects.create(name="Second Label")
+        self.task = Task.objects.create(
+            name="Test Task",
+            description="Line one\nLine two, with comma",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+        self.task.labels.add(self.label, self.label2)
+        self.done_task = Task.objects.create(
+            name="Done Task",
+            description="Finished",
+            status=self.status2,
+            owner=self.user,
+            executor=self.user,
+        )
+        self.export_url = reverse("tasks:tasks_export")
+        self.client.force_login(self.user)
+
+    def export(self, params):
+        response = self.client.get(self.export_url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        content = self.export({"format": "csv"})
+        rows = list(csv.DictReader(StringIO(content)))
+
+        self.assertEqual([row["name"] for row in rows],
+                         ["Test Task", "Done Task"])
+        self.assertEqual(rows[0]["description"], self.task.description)
+        self.assertEqual(rows[0]["status"], "To Do")
+        self.assertEqual(rows[0]["owner"], "testuser")
+        self.assertEqual(
+            set(rows[0]["labels"].split(";")),
+            {"Test Label", "Second Label"})
+        self.assertEqual(rows[1]["labels"], "")
+
+    def test_jsonl_export_applies_filters(self):
+        content = self.export({"format": "jsonl", "labels": self.label.id})
+        records = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["id"], self.task.id)
+        # Фильтр по одной метке не урезает список меток задачи
+        self.assertEqual(
+            set(records[0]["labels"]), {"Test Label", "Second Label"})
+
+    def test_unknown_format(self):
+        response = self.client.get(self.export_url, {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_required(self):
+        self.client.logout()
+        response = self.client.get(self.export_url)
+        self.assertEqual(response.status_code, 302)
+
+
+class ImportTasksCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.another_user = User.objects.create_user(
+            username="anotheruser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.label = Label.objects.create(name="Test Label")
+        self.label2 = Label.objects.create(name="Second Label")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.directory.name) / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def run_import(self, path, **options):
+        call_command("import_tasks", path, stdout=StringIO(), **options)
+
+    def test_csv_import_in_batches(self):
+        path = self.write("tasks.csv", (
+            "name,description,status,owner,executor,labels\n"
+            "First,One,To Do,testuser,anotheruser,Test Label;Second Label\n"
+            "Second,Two,To Do,anotheruser,testuser,\n"
+            "Third,Three,To Do,testuser,testuser,Second Label\n"
+        ))
+        self.run_import(path, batch_size=2)
+
+        self.assertEqual(Task.objects.count(), 3)
+        first = Task.objects.get(name="First")
+        self.assertEqual(first.owner, self.user)
+        self.assertEqual(first.executor, self.another_user)
+        self.assertEqual(
+            set(first.labels.all()), {self.label, self.label2})
+        self.assertFalse(Task.objects.get(name="Second").labels.exists())
+        self.assertEqual(
+            list(Task.objects.get(name="Third").labels.all()), [self.label2])
+
+    def test_jsonl_import_with_defaults(self):
+        path = self.write("tasks.jsonl", "\n".join([
+            json.dumps({"name": "First", "status": "New",
+                        "executor": "testuser", "labels": ["Fresh"]}),
+            json.dumps({"name": "Second", "status": "To Do",
+                        "executor": "anotheruser"}),
+        ]))
+        self.run_import(path, owner="testuser", create_missing=True)
+
+        first = Task.objects.get(name="First")
+        self.assertEqual(first.owner, self.user)
+        self.assertEqual(first.status.name, "New")
+        self.assertEqual([label.name for label in first.labels.all()],
+                         ["Fresh"])
+
+    def test_unknown_reference_aborts(self):
+        path = self.write("tasks.csv", (
+            "name,status,owner,executor\n"
+            "First,To Do,testuser,testuser\n"
+            "Second,Missing,testuser,testuser\n"
+        ))
+        with self.assertRaisesMessage(CommandError, "unknown status"):
+            self.run_import(path, batch_size=1)
+        self.assertEqual(
+            list(Task.objects.values_list("name", flat=True)), ["First"])
+
+    def test_duplicate_name_rolls_back_batch(self):
+        path = self.write("tasks.csv", (
+            "name,status,owner,executor,labels\n"
+            "First,To Do,testuser,testuser,Test Label\n"
+            "First,To Do,testuser,testuser,Test Label\n"
+        ))
+        with self.assertRaisesMessage(CommandError, "were not imported"):
+            self.run_import(path)
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(Task.labels.through.objects.exists())
+
+
+class TaskBulkActionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.another_user = User.objects.create_user(
+            username="anotheruser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.status2 = Status.objects.create(name="Done")
+        self.label = Label.objects.create(name="Test Label")
+        self.label2 = Label.objects.create(name="Second Label")
+        self.own_tasks = [
+            Task.objects.create(
+                name=f"Own Task {number}",
+                description="Description",
+                status=self.status,
+                owner=self.user,
+                executor=self.user,
+            )
+            for number in range(3)
+        ]
+        self.foreign_task = Task.objects.create(
+            name="Foreign Task",
+            description="Description",
+            status=self.status,
+            owner=self.another_user,
+            executor=self.another_user,
+        )
+        self.all_ids = [task.id for task in self.own_tasks]
+        self.all_ids.append(self.foreign_task.id)
+        self.bulk_url = reverse("tasks:tasks_bulk")
+        self.client.force_login(self.user)
+
+    def post(self, data):
+        return self.client.post(self.bulk_url, {"tasks": self.all_ids, **data})
+
+    def test_change_status_in_one_update(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(
+                {"action": "set_status", "status": self.status2.id})
+        updates = [
+            query for query in context.captured_queries
+            if query["sql"].startswith('UPDATE "tasks_task"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertRedirects(response, reverse("tasks:tasks_index"))
+
+        self.assertEqual(
+            Task.objects.filter(status=self.status2).count(), 3)
+        self.foreign_task.refresh_from_db()
+        self.assertEqual(self.foreign_task.status, self.status)
+
+        messages = [str(m) for m in response.wsgi_request._messages]
+        self.assertIn("Задач изменено: 3", messages)
+        self.assertTrue(any("пропущено: 1" in m for m in messages))
+
+    def test_reassign_executor(self):
+        updated_at = self.own_tasks[0].updated_at
+        self.post({"action": "set_executor",
+                   "executor": self.another_user.id})
+
+        task = Task.objects.get(id=self.own_tasks[0].id)
+        self.assertEqual(task.executor, self.another_user)
+        self.assertGreater(task.updated_at, updated_at)
+
+    def test_add_and_remove_labels(self):
+        self.own_tasks[0].labels.add(self.label)
+
+        self.post({"action": "add_labels",
+                   "labels": [self.label.id, self.label2.id]})
+        for task in self.own_tasks:
+            self.assertEqual(
+                set(task.labels.all()), {self.label, self.label2})
+        self.assertFalse(self.foreign_task.labels.exists())
+
+        self.post({"action": "remove_labels", "labels": [self.label.id]})
+        for task in self.own_tasks:
+            self.assertEqual(list(task.labels.all()), [self.label2])
+
+    def test_invalid_form(self):
+        response = self.client.post(
+            self.bulk_url, {"action": "set_status"})
+        self.assertRedirects(response, reverse("tasks:tasks_index"))
+        self.assertFalse(Task.objects.filter(status=self.status2).exists())
+
+        response = self.post({"action": "set_status"})
+        self.assertFalse(Task.objects.filter(status=self.status2).exists())
+
+    def test_redirects_back_to_filtered_list(self):
+        next_url = reverse("tasks:tasks_index") + f"?status={self.status.id}"
+        response = self.post({"action": "set_status",
+                              "status": self.status2.id, "next": next_url})
+        self.assertRedirects(response, next_url)
+
+        response = self.post({"action": "set_status",
+                              "status": self.status2.id,
+                              "next": "https://example.com/"})
+        self.assertRedirects(response, reverse("tasks:tasks_index"))
+
+    def test_get_not_allowed(self):
+        response = self.client.get(self.bulk_url)
+        self.assertEqual(response.status_code, 405)
+
+    def test_list_renders_choices_once(self):
+        response = self.client.get(reverse("tasks:tasks_index"))
+
+        # Форма действий берёт варианты у фильтра на странице
+        for obj in (self.status2, self.label2):
+            self.assertContains(
+                response, f'<option value="{obj.id}">{obj.name}</option>',
+                count=1)
+        for name in ("status", "executor", "labels"):
+            self.assertContains(response, f'data-options-from="{name}"')
+
+
+class TaskApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+            first_name="Test",
+            last_name="User",
+        )
+        self.another_user = User.objects.create_user(
+            username="anotheruser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.status2 = Status.objects.create(name="Done")
+        self.label = Label.objects.create(name="Test Label")
+        self.tasks = [
+            Task.objects.create(
+                name=f"Task {number}",
+                description="Description",
+                status=self.status,
+                owner=self.user,
+                executor=self.another_user,
+            )
+            for number in range(3)
+        ]
+        self.tasks[0].labels.add(self.label)
+        self.list_url = reverse("tasks_api:tasks_list")
+        self.client.force_login(self.user)
+
+    def get(self, url, params=None, status_code=200):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return response.json()
+
+    def test_full_representation(self):
+        data = self.get(
+            reverse("tasks_api:tasks_detail", args=[self.tasks[0].id]))
+
+        self.assertEqual(data["name"], "Task 0")
+        self.assertEqual(
+            data["status"], {"id": self.status.id, "name": "To Do"})
+        self.assertEqual(data["owner"], {
+            "id": self.user.id,
+            "username": "testuser",
+            "first_name": "Test",
+            "last_name": "User",
+        })
+        self.assertEqual(
+            data["labels"], [{"id": self.label.id, "name": "Test Label"}])
+        self.assertIn("created_at", data)
+
+    def test_sparse_fields_skip_joins(self):
+        with CaptureQueriesContext(connection) as context:
+            data = self.get(self.list_url, {"fields": "id,name"})
+        queries = [query["sql"] for query in context.captured_queries]
+
+        self.assertEqual(
+            data["results"][0], {"id": self.tasks[2].id, "name": "Task 2"})
+        tasks_query = next(sql for sql in queries if '"tasks_task"' in sql)
+        self.assertNotIn("JOIN", tasks_query)
+        self.assertNotIn('"description"', tasks_query)
+        self.assertFalse(any("tasks_task_labels" in sql for sql in queries))
+
+    def test_labels_in_one_query(self):
+        for task in self.tasks[1:]:
+            task.labels.add(self.label)
+        with CaptureQueriesContext(connection) as context:
+            self.get(self.list_url, {"fields": "id,labels"})
+        label_queries = [
+            query for query in context.captured_queries
+            if "tasks_task_labels" in query["sql"]
+        ]
+        self.assertEqual(len(label_queries), 1)
+
+    def test_cursor_paging(self):
+        data = self.get(self.list_url, {"fields": "id", "limit": 2})
+        self.assertEqual(
+            [item["id"] for item in data["results"]],
+            [self.tasks[2].id, self.tasks[1].id],
+        )
+        self.assertIsNone(data["previous"])
+        self.assertIn("fields=id", data["next"])
+
+        data = self.get(data["next"])
+        self.assertEqual(
+            [item["id"] for item in data["results"]], [self.tasks[0].id])
+        self.assertIsNone(data["next"])
+        self.assertIsNotNone(data["previous"])
+
+    def test_filters(self):
+        self.tasks[1].status = self.status2
+        self.tasks[1].save()
+
+        data = self.get(
+            self.list_url, {"fields": "id", "status": self.status2.id})
+        self.assertEqual(data["results"], [{"id": self.tasks[1].id}])
+
+        data = self.get(
+            self.list_url, {"fields": "id", "labels": self.label.id})
+        self.assertEqual(data["results"], [{"id": self.tasks[0].id}])
+
+    def test_errors(self):
+        data = self.get(
+            self.list_url, {"fields": "id,secret"}, status_code=400)
+        self.assertIn("fields", data["errors"])
+
+        data = self.get(self.list_url, {"status": "abc"}, status_code=400)
+        self.assertIn("status", data["errors"])
+
+        data = self.get(self.list_url, {"cursor": "garbage"}, status_code=400)
+        self.assertIn("cursor", data["errors"])
+
+        self.get(reverse("tasks_api:tasks_detail", args=[0]), status_code=404)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        data = self.get(self.list_url, status_code=401)
+        self.assertIn("detail", data)
+
+
+class TaskConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.another_user = User.objects.create_user(
+            username="anotheruser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.label = Label.objects.create(name="Test Label")
+        self.task = Task.objects.create(
+            name="Test Task",
+            description="Description",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+        self.task.labels.add(self.label)
+        self.other_task = Task.objects.create(
+            name="Other Task",
+            description="Description",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+        self.list_url = reverse("tasks:tasks_index")
+        self.detail_url = reverse("tasks:tasks_detail", args=[self.task.id])
+        self.client.force_login(self.user)
+
+    def revalidate(self, url, response, params=None):
+        return self.client.get(
+            url, params or {}, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def assertNotModified(self, url, params=None):
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        repeat = self.revalidate(url, response, params)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.templates, [])
+        return response
+
+    def test_detail_not_modified(self):
+        response = self.assertNotModified(self.detail_url)
+        self.assertIn("Last-Modified", response)
+
+        self.task.name = "Renamed Task"
+        self.task.save()
+        self.assertEqual(
+            self.revalidate(self.detail_url, response).status_code, 200)
+
+    def test_related_changes_refresh_detail(self):
+        for obj, field in ((self.status, "name"), (self.label, "name"),
+                           (self.user, "first_name")):
+            response = self.assertNotModified(self.detail_url)
+            setattr(obj, field, "Changed")
+            obj.save()
+            self.assertEqual(
+                self.revalidate(self.detail_url, response).status_code, 200)
+
+    def test_list_not_modified(self):
+        response = self.assertNotModified(self.list_url)
+
+        self.other_task.delete()
+        self.assertEqual(
+            self.revalidate(self.list_url, response).status_code, 200)
+
+        response = self.assertNotModified(self.list_url)
+        self.label.name = "Changed"
+        self.label.save()
+        self.assertEqual(
+            self.revalidate(self.list_url, response).status_code, 200)
+
+    def test_task_changes_refresh_list(self):
+        self.client.force_login(self.user)
+        bulk_url = reverse("tasks:tasks_bulk")
+        changes = (
+            lambda: self.other_task.save(),
+            lambda: self.other_task.labels.add(self.label),
+            lambda: self.other_task.labels.clear(),
+            lambda: self.client.post(bulk_url, {
+                "tasks": [self.task.id], "action": "remove_labels",
+                "labels": [self.label.id]}),
+        )
+        for change in changes:
+            response = self.assertNotModified(self.list_url)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            # Сообщение массового действия показываем на другой странице,
+            # иначе список отрисовался бы заново ради него
+            self.client.get(self.detail_url)
+            self.assertEqual(
+                self.revalidate(self.list_url, response).status_code, 200)
+
+    def test_list_validator_covers_filters_and_user(self):
+        response = self.assertNotModified(
+            self.list_url, {"status": self.status.id})
+
+        repeat = self.revalidate(self.list_url, response, {"my_tasks": "true"})
+        self.assertEqual(repeat.status_code, 200)
+
+        self.client.force_login(self.another_user)
+        repeat = self.revalidate(
+            self.list_url, response, {"status": self.status.id})
+        self.assertEqual(repeat.status_code, 200)
+
+    def test_pending_messages_render_page(self):
+        response = self.client.get(self.list_url)
+        # Чужую задачу удалить нельзя: данные те же, но есть сообщение
+        Task.objects.filter(id=self.other_task.id).update(
+            owner=self.another_user)
+        self.client.get(
+            reverse("tasks:tasks_delete", args=[self.other_task.id]))
+
+        repeat = self.revalidate(self.list_url, response)
+        self.assertEqual(repeat.status_code, 200)
+        self.assertContains(
+            repeat, "Задачу может удалить только ее автор")
+
+
+@override_settings(ROOT_URLCONF="task_manager.asgi_urls")
+class AsyncTaskViewsTests(TaskConditionalGetTests):
+    def page(self, response):
+        # Токен CSRF у каждого ответа свой
+        return re.sub(
+            r'name="csrfmiddlewaretoken" value="[^"]+"', "",
+            response.content.decode(),
+        )
+
+    def test_views_are_async(self):
+        for url in (self.list_url, self.detail_url):
+            self.assertTrue(resolve(url).func.view_class.view_is_async)
+
+    def test_list_matches_sync_view(self):
+        params = {"status": self.status.id, "labels": self.label.id}
+        for query in ({}, params, {"status": 0}):
+            response = self.client.get(self.list_url, query)
+            with override_settings(ROOT_URLCONF="task_manager.urls"):
+                expected = self.client.get(self.list_url, query)
+            self.assertEqual(self.page(response), self.page(expected))
+
+    def test_detail_matches_sync_view(self):
+        response = self.client.get(self.detail_url)
+        with override_settings(ROOT_URLCONF="task_manager.urls"):
+            expected = self.client.get(self.detail_url)
+        self.assertEqual(self.page(response), self.page(expected))
+        self.assertContains(response, "Test Label")
+
+        missing = reverse("tasks:tasks_detail", args=[0])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_login_required(self):
+        self.client.logout()
+        for url in (self.list_url, self.detail_url):
+            self.assertRedirects(self.client.get(url), reverse("login"))
+
+    async def test_async_client(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.list_url)
+        self.assertContains(response, "Test Task")
+        response = await self.async_client.get(self.detail_url)
+        self.assertContains(response, "Test Task")
+
+
+class BenchmarkTaskViewsCommandTests(TransactionTestCase):
+    def test_compares_wsgi_and_asgi(self):
+        user = User.objects.create_user(username="testuser")
+        Task.objects.create(
+            name="Test Task",
+            description="Description",
+            status=Status.objects.create(name="To Do"),
+            owner=user,
+            executor=user,
+        )
+
+        out = StringIO()
+        call_command(
+            "benchmark_task_views", requests=4, concurrency=2, stdout=out)
+        output = out.getvalue()
+
+        self.assertIn("WSGI, sync views", output)
+        self.assertIn("ASGI, async views", output)
+        self.assertEqual(output.count("tasks_detail: p50"), 2)
+        self.assertFalse(
+            User.objects.filter(username__startswith="benchmark-").exists())
+
+    def test_requires_tasks(self):
+        with self.assertRaises(CommandError):
+            call_command("benchmark_task_views", stdout=StringIO())
+
+
+class TaskRowCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.tasks = [
+            Task.objects.create(
+                name=f"Task {number}",
+                description="Description",
+                status=self.status,
+                owner=self.user,
+                executor=self.user,
+            )
+            for number in range(3)
+        ]
+        self.tasks_url = reverse("tasks:tasks_index")
+        self.client.force_login(self.user)
+
+    def test_rows_come_from_cache(self):
+        self.client.get(self.tasks_url)
+        # update() не меняет updated_at, поэтому строка остаётся в кэше
+        Task.objects.filter(id=self.tasks[0].id).update(name="Hidden Name")
+
+        with mock.patch(
+            "task_manager.tasks.views.render_to_string"
+        ) as render, mock.patch.object(
+            cache, "get_many", wraps=cache.get_many
+        ) as get_many:
+            response = self.client.get(self.tasks_url)
+
+        render.assert_not_called()
+        fragment_reads = [
+            call for call in get_many.call_args_list
+            if call.args[0][0].startswith("fragment:")
+        ]
+        self.assertEqual(len(fragment_reads), 1)
+        self.assertEqual(len(fragment_reads[0].args[0]), 3)
+        self.assertContains(response, "Task 0")
+        self.assertNotContains(response, "Hidden Name")
+
+    def test_changes_refresh_rows(self):
+        self.client.get(self.tasks_url)
+
+        self.tasks[0].name = "Renamed Task"
+        self.tasks[0].save()
+        response = self.client.get(self.tasks_url)
+        self.assertContains(response, "Renamed Task")
+
+        self.status.name = "In Progress"
+        self.status.save()
+        response = self.client.get(self.tasks_url)
+        self.assertContains(response, "<td>In Progress</td>", count=3)
+
+        self.user.first_name = "New"
+        self.user.last_name = "Name"
+        self.user.save()
+        response = self.client.get(self.tasks_url)
+        self.assertContains(response, "<td>New Name</td>", count=6)
+
+
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser",
+            password="testpassword",
+        )
+        self.status = Status.objects.create(name="To Do")
+        self.status2 = Status.objects.create(name="Done")
+        self.label = Label.objects.create(name="Test Label")
+        self.label2 = Label.objects.create(name="Second Label")
+        self.task = self.create_task("Test Task")
+
+    def create_task(self, name):
+        return Task.objects.create(
+            name=name,
+            description="Description",
+            status=self.status,
+            owner=self.user,
+            executor=self.user,
+        )
+
+    def assertCounts(self, statuses=None, labels=None):
+        for obj, expected in {**(statuses or {}), **(labels or {})}.items():
+            obj.refresh_from_db()
+            self.assertEqual(obj.task_count, expected, obj)
+
+    def test_status_counts(self):
+        self.assertCounts({self.status: 1, self.status2: 0})
+
+        task = Task.objects.get(id=self.task.id)
+        task.status = self.status2
+        task.save()
+        self.assertCounts({self.status: 0, self.status2: 1})
+
+        task.name = "Renamed Task"
+        task.save()
+        self.assertCounts({self.status: 0, self.status2: 1})
+
+        task.delete()
+        self.assertCounts({self.status: 0, self.status2: 0})
+
+    def test_counts_after_concurrent_status_change(self):
+        status3 = Status.objects.create(name="Testing")
+        stale = Task.objects.get(id=self.task.id)
+        # Другой запрос успел сменить статус, объект в памяти устарел
+        other = Task.objects.get(id=self.task.id)
+        other.status = self.status2
+        other.save()
+
+        stale.status = status3
+        stale.save()
+        self.assertCounts({self.status: 0, self.status2: 0, status3: 1})
+
+        stale.status = self.status
+        other.delete()
+        self.assertCounts({self.status: 0, self.status2: 0, status3: 0})
+
+    def test_label_counts(self):
+        self.task.labels.add(self.label, self.label2)
+        self.task.labels.add(self.label)
+        self.assertCounts(labels={self.label: 1, self.label2: 1})
+
+        self.label.tasks_labels.add(self.create_task("Another Task"))
+        self.task.labels.remove(self.label2, self.label2)
+        self.assertCounts(labels={self.label: 2, self.label2: 0})
+
+        self.task.labels.set([self.label2])
+        self.assertCounts(labels={self.label: 1, self.label2: 1})
+
+        self.label.tasks_labels.clear()
+        self.task.delete()
+        self.assertCounts(labels={self.label: 0, self.label2: 0})
+
+    def test_queryset_delete_updates_counts(self):
+        other = self.create_task("Another Task")
+        self.task.labels.add(self.label, self.label2)
+        other.labels.add(self.label)
+        kept = self.create_task("Kept Task")
+        kept.labels.add(self.label)
+
+        Task.objects.filter(id__in=[self.task.id, other.id]).delete()
+
+        self.assertCounts({self.status: 1}, {self.label: 1, self.label2: 0})
+
+    def test_admin_delete_selected_updates_counts(self):
+        self.task.labels.add(self.label)
+        self.client.force_login(User.objects.create_superuser(
+            username="admin", password="adminpassword"))
+
+        response = self.client.post(
+            reverse("admin:tasks_task_changelist"),
+            {
+                "action": "delete_selected",
+                "_selected_action": [self.task.id],
+                "post": "yes",
+            },
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Task.objects.exists())
+        self.assertCounts({self.status: 0}, {self.label: 0})
+
+    def test_form_updates_counts(self):
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse("tasks:tasks_update", args=[self.task.id]),
+            {
+                "name": "Test Task",
+                "description": "Description",
+                "status": self.status2.id,
+                "executor": self.user.id,
+                "labels": [self.label.id],
+            },
+        )
+        self.assertCounts(
+            {self.status: 0, self.status2: 1}, {self.label: 1})
+
+    def test_bulk_actions_update_counts(self):
+        other = self.create_task("Another Task")
+        other.labels.add(self.label)
+        self.client.force_login(self.user)
+        bulk_url = reverse("tasks:tasks_bulk")
+        tasks = [self.task.id, other.id]
+
+        self.client.post(bulk_url, {"tasks": tasks, "action": "set_status",
+                                    "status": self.status2.id})
+        self.assertCounts({self.status: 0, self.status2: 2})
+
+        self.client.post(bulk_url, {"tasks": tasks, "action": "add_labels",
+                                    "labels": [self.label.id]})
+        self.assertCounts(labels={self.label: 2})
+
+        self.client.post(bulk_url, {"tasks": tasks,
+                                    "action": "remove_labels",
+                                    "labels": [self.label.id, self.label2.id]})
+        self.assertCounts(labels={self.label: 0, self.label2: 0})
+
+    def test_import_updates_counts(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "tasks.jsonl"
+        path.write_text(json.dumps({
+            "name": "Imported Task", "status": "Done",
+            "owner": "testuser", "executor": "testuser",
+            "labels": ["Test Label"],
+        }) + "\n", encoding="utf-8")
+        call_command("import_tasks", str(path), stdout=StringIO())
+
+        self.assertCounts({self.status2: 1}, {self.label: 1})
+
+    def test_in_use_is_not_deleted(self):
+        self.task.labels.add(self.label)
+        stale_status = Status.objects.get(id=self.status.id)
+        stale_label = Label.objects.get(id=self.label.id)
+        stale_status.task_count = stale_label.task_count = 0
+
+        with self.assertRaises(ValidationError):
+            stale_status.delete()
+        with self.assertRaises(ValidationError):
+            stale_label.delete()
+
+
+class TaskQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser")
+        self.client.force_login(self.user)
+
+    def test_task_list(self):
+        def populate(size):
+            # Много разных исполнителей, статусов и меток на странице
+            seed(users=10, statuses=3, labels=10,
+                 tasks=size - Task.objects.count(), random_seed=size)
+
+        self.assertQueryBudget(reverse("tasks:tasks_index"), populate)
+
+    def test_filtered_task_list(self):
+        status = Status.objects.create(name="Status")
+        label = Label.objects.create(name="Label")
+
+        def populate(size):
+            # Все задачи проходят фильтры и поиск
+            tasks = Task.objects.bulk_create(
+                Task(name=f"Task {number}", status=status, owner=self.user,
+                     executor=self.user)
+                for number in range(Task.objects.count(), size)
+            )
+            Task.labels.through.objects.bulk_create(
+                Task.labels.through(task=task, label=label) for task in tasks)
+            change_counts(Status, {status.pk: len(tasks)})
+            change_counts(Label, {label.pk: len(tasks)})
+
+        query = urlencode({
+            "status": status.pk,
+            "executor": self.user.pk,
+            "labels": label.pk,
+            "self_tasks": "on",
+            "q": "task",
+        })
+        self.assertQueryBudget(
+            f"{reverse('tasks:tasks_index')}?{query}", populate)
+
+    def test_task_detail(self):
+        status = Status.objects.create(name="Status")
+        task = Task.objects.create(
+            name="Task", status=status, owner=self.user, executor=self.user)
+
+        def populate(size):
+            labels = Label.objects.bulk_create(
+                Label(name=f"Label {number}")
+                for number in range(task.labels.count(), size)
+            )
+            task.labels.add(*labels)
+
+        self.assertQueryBudget(
+            reverse("tasks:tasks_detail", kwargs={"pk": task.pk}), populate)
@@ -6,6 +6,8 @@ app_name = "tasks"
 
 urlpatterns = [
     path('', views.TaskListView.as_view(), name='tasks_index'),
+    path('export/', views.TaskExportView.as_view(), name='tasks_export'),
+    path('bulk/', views.TaskBulkActionView.as_view(), name='tasks_bulk'),
     path('create/', views.TaskCreateView.as_view(), name='tasks_create'),
     path(
         '<int:pk>/update/',
@@ -1,37 +1,249 @@
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db.models import aprefetch_related_objects
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import redirect
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils.functional import cached_property
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.translation import get_language
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import (
     CreateView,
     DeleteView,
     DetailView,
+    FormView,
     UpdateView,
+    View,
 )
 from django_filters.views import FilterView
 
-from task_manager.mixins import CustomLoginRequiredMixin
+from task_manager.cache import (
+    aget_versions,
+    cached_fragments,
+    get_versions,
+    model_namespace,
+)
+from task_manager.labels.models import Label
+from task_manager.mixins import (
+    AsyncUserMixin,
+    ConditionalGetMixin,
+    CustomLoginRequiredMixin,
+    ReplicaReadMixin,
+)
+from task_manager.pagination import KeysetPaginationMixin
+from task_manager.statuses.models import Status
+from task_manager.users.models import User
 
-from .forms import TaskFilter, TaskForm
+from .export import FORMATS
+from .forms import TaskBulkActionForm, TaskFilter, TaskForm, aload_choices
 from .models import Task
+from .search import ranked_ordering
 
 SUCCESS_URL = "tasks:tasks_index"
+# Страницы задач показывают имена статусов, меток и пользователей
+RELATED_MODELS = (Status, Label, User)
+
+
+def related_versions(*models):
+    return get_versions(
+        *(model_namespace(model) for model in (*models, *RELATED_MODELS))
+    )
+
+
+async def arelated_versions(*models):
+    return await aget_versions(
+        *(model_namespace(model) for model in (*models, *RELATED_MODELS))
+    )
 
 
-class TaskListView(CustomLoginRequiredMixin, FilterView):
+class TaskListView(
+    CustomLoginRequiredMixin,
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    KeysetPaginationMixin,
+    FilterView
+):
     model = Task
+    replica_models = (Task, *RELATED_MODELS)
     template_name = "tasks/tasks_index.html"
     context_object_name = "tasks"
+    # С фильтрами добавляются выбранные статус, исполнитель и метка
+    max_queries = 11
     filterset_class = TaskFilter
+    row_template_name = "tasks/tasks_row.html"
+
+    def get_queryset(self):
+        # Всё, что показывает таблица, грузится за постоянное число запросов
+        return (
+            Task.objects
+            .select_related("status", "owner", "executor")
+            .prefetch_related("labels")
+            .defer("description")
+        )
+
+    def get_validators(self):
+        filterset = self.get_filterset(self.get_filterset_class())
+        if filterset.is_bound and not filterset.is_valid():
+            return None
+        return self.make_validators(related_versions(Task))
+
+    def make_validators(self, versions):
+        # Версия задач меняется при каждом сохранении, удалении и смене
+        # меток, поэтому max(updated_at) по выборке не нужен. Времени
+        # изменения без него нет, страницу сверяют только по ETag
+        return (sorted(self.request.GET.lists()), *versions), None
+
+    def get_keyset_ordering(self, queryset):
+        return ranked_ordering(queryset, self.keyset_ordering)
 
     def get_filterset(self, filterset_class):
-        # Передача текущего пользователя в фильтр
-        return filterset_class(
-            self.request.GET or None,
-            queryset=self.get_queryset(),
-            request=self.request
+        # get_validators() и FilterView.get() берут один и тот же фильтр,
+        # чтобы выбранные статус, исполнитель и метка проверялись один раз
+        if not hasattr(self, "filterset"):
+            # Передача текущего пользователя в фильтр
+            self.filterset = filterset_class(
+                self.request.GET or None,
+                queryset=self.get_queryset(),
+                request=self.request
+            )
+        return self.filterset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["bulk_form"] = self.bulk_form
+        context["task_rows"] = self.render_rows(context["tasks"])
+        return context
+
+    @cached_property
+    def bulk_form(self):
+        # Поля называются так же, как в фильтре: id не должны совпасть
+        return TaskBulkActionForm(auto_id="bulk_%s")
+
+    def render_rows(self, tasks):
+        # Строка зависит только от задачи, её статуса и пользователей
+        versions = ":".join(
+            str(version) for version in get_versions(
+                model_namespace(Status), model_namespace(User))
+        )
+        language = get_language()
+        return cached_fragments(
+            list(tasks),
+            key=lambda task: (
+                f"{self.row_template_name}:{task.id}:"
+                f"{task.updated_at.timestamp()}:{language}:{versions}"
+            ),
+            render=lambda task: render_to_string(
+                self.row_template_name, {"task": task}),
+        )
+
+
+class AsyncTaskListView(AsyncUserMixin, TaskListView):
+    """
+    TaskListView on the async ORM, served through task_manager.asgi.
+
+    The page, its total and the select choices are loaded one after
+    another: the async ORM runs every query in the same thread as the
+    sync code of the request, so gathering them wouldn't overlap them.
+    The gain is the event loop serving other requests meanwhile. Only
+    filter validation and row rendering, which have no async API, run in
+    a thread.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.filterset = self.get_filterset(self.get_filterset_class())
+        # Выбранные статус, исполнитель и метка проверяются запросами
+        is_valid = await sync_to_async(self.filterset.is_valid)()
+        if self.filterset.is_bound and not is_valid:
+            if self.get_strict():
+                self.object_list = self.filterset.queryset.none()
+            else:
+                self.object_list = self.filterset.qs
+            return await self.render_page(request)
+
+        self.object_list = self.filterset.qs
+        if self.has_pending_messages(request):
+            return await self.render_page(request)
+        validators = self.make_validators(await arelated_versions(Task))
+        return await self.get_conditional_view(
+            self.render_page, validators)(request)
+
+    async def render_page(self, request):
+        self.pagination = await self.apaginate_queryset(
+            self.object_list, self.get_paginate_by(self.object_list))
+        await aload_choices(self.filterset.form)
+        context = await sync_to_async(self.get_context_data)(
+            filter=self.filterset, object_list=self.object_list)
+        return self.render_to_response(context)
+
+    def paginate_queryset(self, queryset, page_size):
+        # Страница уже загружена в render_page()
+        return self.pagination
+
+
+class TaskExportView(CustomLoginRequiredMixin, View):
+    filterset_class = TaskFilter
+    message_format = _("Unknown export format")
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest(self.message_format)
+        stream, content_type = FORMATS[export_format]
+
+        filterset = self.filterset_class(
+            request.GET or None,
+            queryset=Task.objects.all(),
+            request=request
         )
+        # Как и FilterView, при ошибках в фильтре не отдаём ничего
+        queryset = filterset.qs if filterset.is_valid() else Task.objects.none()
+
+        response = StreamingHttpResponse(
+            stream(queryset), content_type=content_type
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="tasks.{export_format}"'
+        )
+        return response
+
+
+class TaskBulkActionView(CustomLoginRequiredMixin, FormView):
+    form_class = TaskBulkActionForm
+    http_method_names = ["post"]
+    success_url = reverse_lazy(SUCCESS_URL)
+    success_message = _("Tasks updated: %(count)s")
+    skipped_message = _(
+        "Tasks skipped: %(count)s. Only the author can change a task"
+    )
+
+    def get_success_url(self):
+        next_url = self.request.POST.get("next")
+        if next_url and url_has_allowed_host_and_scheme(
+            next_url,
+            allowed_hosts={self.request.get_host()},
+            require_https=self.request.is_secure(),
+        ):
+            return next_url
+        return super().get_success_url()
+
+    def form_valid(self, form):
+        count = form.apply(self.request.user)
+        messages.success(self.request, self.success_message % {
+            "count": count})
+        skipped = len(form.cleaned_data["tasks"]) - count
+        if skipped:
+            messages.warning(self.request, self.skipped_message % {
+                "count": skipped})
+        return redirect(self.get_success_url())
+
+    def form_invalid(self, form):
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(self.request, error)
+        return redirect(self.get_success_url())
 
 
 class TaskCreateView(CustomLoginRequiredMixin, CreateView):
@@ -94,12 +306,62 @@ class TaskDeleteView(
         return response
 
 
-class TaskDetailView(CustomLoginRequiredMixin, DetailView):
+class TaskDetailView(
+    CustomLoginRequiredMixin,
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    DetailView
+):
     model = Task
+    replica_models = (Task, *RELATED_MODELS)
     template_name = "tasks/tasks_detail.html"
     context_object_name = "task"
+    max_queries = 9
+
+    def get_validators(self):
+        last_modified = (
+            Task.objects
+            .filter(pk=self.kwargs["pk"])
+            .values_list("updated_at", flat=True)
+            .first()
+        )
+        # Несуществующую задачу отдаёт 404 сам DetailView
+        if last_modified is None:
+            return None
+        return (last_modified, *related_versions()), last_modified
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["task"] = self.get_object()
         return context
+
+
+class AsyncTaskDetailView(AsyncUserMixin, TaskDetailView):
+    """TaskDetailView on the async ORM, served through task_manager.asgi."""
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset().select_related(
+            "status", "owner", "executor")
+        try:
+            self.object = await queryset.aget(pk=self.kwargs["pk"])
+        except Task.DoesNotExist:
+            raise Http404(
+                _("No %(verbose_name)s found matching the query")
+                % {"verbose_name": Task._meta.verbose_name}
+            )
+        if self.has_pending_messages(request):
+            return await self.render_page(request)
+        last_modified = self.object.updated_at
+        validators = (
+            (last_modified, *await arelated_versions()), last_modified)
+        return await self.get_conditional_view(
+            self.render_page, validators)(request)
+
+    async def render_page(self, request):
+        await aprefetch_related_objects([self.object], "labels")
+        context = self.get_context_data(object=self.object)
+        return self.render_to_response(context)
+
+    def get_object(self, queryset=None):
+        # Задача уже загружена в get()
+        return self.object
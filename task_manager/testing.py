@@ -0,0 +1,49 @@
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from task_manager.instrumentation import get_query_budget
+
+BUDGET_DATASET_SIZES = (1, 100, 1000)
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin checking ``max_queries`` of views, the budgets that
+    QueryBudgetMiddleware enforces in DEBUG.
+    """
+
+    def assertQueryBudget(self, url, populate, sizes=BUDGET_DATASET_SIZES,
+                          method="GET", data=None):
+        """
+        Request ``url`` with ``method`` after ``populate(size)`` for every
+        size and fail when a request runs more queries than the view's
+        budget for that method. ``populate`` grows the data the page shows
+        to ``size`` rows; sizes go up, so it only adds what is missing.
+        Filters go in the query string of ``url``, a form in ``data``. The
+        cache is cleared before every request, so cached pieces don't hide
+        queries.
+        """
+        max_queries = get_query_budget(
+            resolve(urlsplit(url).path).func, method)
+        self.assertIsNotNone(
+            max_queries, f"{method} {url} has no query budget.")
+        counts = {}
+        for size in sizes:
+            populate(size)
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                response = getattr(self.client, method.lower())(url, data)
+            # Успешная форма отвечает переадресацией
+            self.assertIn(response.status_code, (200, 302), url)
+            counts[size] = len(captured)
+            if len(captured) > max_queries:
+                self.fail(
+                    f"{method} {url} ran {len(captured)} queries with "
+                    f"{size} rows, its budget is {max_queries}:\n"
+                    + "\n".join(query["sql"] for query in captured)
+                )
+        return counts
@@ -0,0 +1,710 @@
+import json
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import rollbar
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connection,
+    connections,
+)
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.template.base import Origin
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from task_manager.benchmarks import find_regressions
+from task_manager.cache import bump_version, model_namespace
+from task_manager.error_reporting import (
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    ReportQueue,
+)
+from task_manager.instrumentation import (
+    NPlusOneError,
+    NPlusOneMiddleware,
+    QueryBudgetExceeded,
+    SlowQueryExplainer,
+)
+from task_manager.labels.models import Label
+from task_manager.loadtest import DEFAULT_MIX, parse_mix
+from task_manager.routers import (
+    PIN_COOKIE,
+    REPLICA,
+    ReplicaPinningMiddleware,
+    ReplicaRouter,
+    use_replica,
+)
+from task_manager.seeding import SEED_PASSWORD, seed
+from task_manager.statuses.models import Status
+from task_manager.tasks.models import Task
+from task_manager.tasks.search import search_tasks
+from task_manager.tasks.views import TaskListView
+from task_manager.users.models import User
+from task_manager.users.views import UserListView
+
+
+class HealthViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse("health")
+
+    def test_database_without_pool(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["database"], "ok")
+        self.assertIsNone(data["pool"])
+        self.assertEqual(data["error_reports"]["circuit"], "closed")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_pool_metrics(self):
+        pool = mock.Mock()
+        pool.get_stats.return_value = {
+            "pool_min": 1,
+            "pool_max": 10,
+            "pool_size": 4,
+            "pool_available": 1,
+            "requests_num": 120,
+            "requests_queued": 8,
+            "requests_wait_ms": 100,
+            "requests_errors": 1,
+        }
+        with mock.patch.object(
+            connections[DEFAULT_DB_ALIAS], "pool", new=pool, create=True
+        ):
+            stats = self.client.get(self.url).json()["pool"]
+
+        self.assertEqual(stats["size"], 4)
+        self.assertEqual(stats["checkouts"], 120)
+        self.assertEqual(stats["queued"], 8)
+        self.assertEqual(stats["avg_wait_ms"], 12.5)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["connections_lost"], 0)
+
+    def test_database_unavailable(self):
+        with mock.patch(
+            "task_manager.views.check_database",
+            side_effect=OperationalError("connection refused"),
+        ):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["database"], "unavailable")
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="timing")
+        status = Status.objects.create(name="New")
+        Task.objects.create(
+            name="Task", status=status, owner=self.user, executor=self.user)
+        self.client.force_login(self.user)
+
+    def metrics(self, response):
+        return dict(
+            metric.split(";", 1)
+            for metric in response["Server-Timing"].split(", ")
+        )
+
+    def test_template_view(self):
+        with self.assertLogs("task_manager.timing", "INFO") as logs:
+            response = self.client.get(reverse("tasks:tasks_index"))
+
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {"db", "view", "tpl", "total"})
+        record = logs.records[0]
+        self.assertGreater(record.queries, 0)
+        self.assertIn(f'desc="{record.queries} queries"', metrics["db"])
+        self.assertEqual(record.view_name, "tasks:tasks_index")
+        self.assertEqual(record.status, 200)
+        self.assertIn("view=tasks:tasks_index method=GET", logs.output[0])
+
+    def test_response_without_template(self):
+        self.client.logout()
+        with self.assertLogs("task_manager.timing", "INFO") as logs:
+            response = self.client.get(reverse("tasks:tasks_index"))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(set(self.metrics(response)), {"db", "view", "total"})
+        self.assertEqual(logs.records[0].queries, 0)
+
+    @override_settings(ROOT_URLCONF="task_manager.asgi_urls")
+    async def test_async_view(self):
+        await self.async_client.aforce_login(self.user)
+        with self.assertLogs("task_manager.timing", "INFO") as logs:
+            response = await self.async_client.get(
+                reverse("tasks:tasks_index"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(self.metrics(response)), {"db", "view", "tpl", "total"})
+        self.assertGreater(logs.records[0].queries, 0)
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled(self):
+        response = self.client.get(reverse("tasks:tasks_index"))
+        self.assertNotIn("Server-Timing", response)
+
+
+class SlowQueryLogTests(TestCase):
+    sql = "SELECT name FROM tasks_task WHERE id = %s"
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SLOW_QUERY_SECONDS=1e-9)
+    def test_queries_of_view_are_reported(self):
+        user = User.objects.create_user(username="slow")
+        status = Status.objects.create(name="New")
+        Task.objects.create(
+            name="Task", status=status, owner=user, executor=user)
+        self.client.force_login(user)
+        with mock.patch(
+            "task_manager.instrumentation.get_explainer"
+        ) as get_explainer:
+            self.client.get(reverse("tasks:tasks_index"))
+
+        report = get_explainer.return_value.report
+        records = [call.args[0] for call in report.mock_calls]
+        task_queries = [
+            record for record in records if '"tasks_task"' in record["sql"]]
+        self.assertTrue(task_queries)
+        record = task_queries[0]
+        self.assertEqual(record["view"], "tasks:tasks_index")
+        self.assertEqual(record["database"], DEFAULT_DB_ALIAS)
+        self.assertTrue(record["location"].startswith("task_manager/"))
+        self.assertIn(
+            "tasks/tasks_index.html",
+            {(record["template"] or "").split(":")[0] for record in records},
+        )
+
+    @override_settings(SLOW_QUERY_SECONDS=1e-9)
+    def test_plan_is_logged_from_background_thread(self):
+        explainer = SlowQueryExplainer()
+        self.addCleanup(explainer.shutdown)
+        with self.assertLogs("task_manager.slow_queries") as logs:
+            future = explainer.report(
+                {"sql": self.sql}, DEFAULT_DB_ALIAS, self.sql, (1,), False)
+            future.result(timeout=5)
+
+        # EXPLAIN самого фонового потока в журнал не попадает
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0].slow_query
+        self.assertIn("tasks_task", record["plan"])
+        self.assertEqual(json.loads(logs.records[0].getMessage()), record)
+
+    def test_full_backlog_is_logged_without_plan(self):
+        explainer = SlowQueryExplainer(backlog=0)
+        self.addCleanup(explainer.shutdown)
+        with self.assertLogs("task_manager.slow_queries") as logs:
+            self.assertIsNone(explainer.report(
+                {"sql": self.sql}, DEFAULT_DB_ALIAS, self.sql, (1,), False))
+        self.assertNotIn("plan", logs.records[0].slow_query)
+
+    def test_disabled(self):
+        with mock.patch(
+            "task_manager.instrumentation.report_slow_query"
+        ) as report, override_settings(SLOW_QUERY_SECONDS=0):
+            list(Task.objects.all())
+        report.assert_not_called()
+
+
+@override_settings(DEBUG=True)
+class QueryBudgetMiddlewareTests(TestCase):
+    def test_request_within_budget(self):
+        self.client.force_login(User.objects.create_user(username="user"))
+
+        response = self.client.get(reverse("users:user_list"))
+
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch.object(UserListView, "max_queries", 0)
+    def test_request_over_budget_fails(self):
+        with self.assertRaisesMessage(
+            QueryBudgetExceeded, "users:user_list ran 1 queries"
+        ):
+            self.client.get(reverse("users:user_list"))
+
+    @mock.patch.object(UserListView, "max_queries", {"GET": 0})
+    def test_budget_by_method(self):
+        # HEAD считается по бюджету GET, у POST бюджета нет
+        self.client.force_login(User.objects.create_user(username="user"))
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.head(reverse("users:user_list"))
+        response = self.client.post(reverse("users:user_list"))
+
+        self.assertEqual(response.status_code, 405)
+
+    @mock.patch.object(UserListView, "max_queries", 0)
+    def test_only_checked_in_debug(self):
+        with override_settings(DEBUG=False):
+            response = self.client.get(reverse("users:user_list"))
+
+        self.assertEqual(response.status_code, 200)
+
+
+# Не зависит от того, с какими настройками запущены тесты
+@override_settings(NPLUSONE_DETECTION=True, NPLUSONE_STRICT=True)
+class NPlusOneDetectionTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="user")
+        label = Label.objects.create(name="Label")
+        for number in range(3):
+            status = Status.objects.create(name=f"Status {number}")
+            task = Task.objects.create(
+                name=f"Task {number}", status=status, owner=user,
+                executor=user)
+            task.labels.add(label)
+
+    def render(self, source, tasks):
+        template = Template(
+            source, origin=Origin("loop.html", template_name="loop.html"))
+
+        def view(request):
+            return HttpResponse(template.render(Context({"tasks": tasks})))
+
+        return NPlusOneMiddleware(view)(RequestFactory().get("/tasks/"))
+
+    def test_lazy_foreign_key_in_loop(self):
+        source = "{% for task in tasks %}\n{{ task.status.name }}{% endfor %}"
+
+        with self.assertRaisesMessage(
+            NPlusOneError,
+            "loop.html:2 loads task.status (Task -> Status) 3 times",
+        ):
+            self.render(source, Task.objects.all())
+        response = self.render(source, Task.objects.select_related("status"))
+        self.assertContains(response, "Status 2")
+
+    def test_lazy_many_to_many_in_loop(self):
+        source = (
+            "{% for task in tasks %}{% for label in task.labels.all %}"
+            "{{ label.name }}{% endfor %}{% endfor %}"
+        )
+
+        with self.assertRaisesMessage(
+            NPlusOneError,
+            "loop.html:1 loads task.labels.all (Task -> Label) 3 times",
+        ):
+            self.render(source, Task.objects.all())
+        response = self.render(source, Task.objects.prefetch_related("labels"))
+        self.assertContains(response, "Label")
+
+    def test_single_lazy_load_is_allowed(self):
+        source = "{% for task in tasks %}{{ task.status.name }}{% endfor %}"
+
+        response = self.render(source, Task.objects.all()[:1])
+
+        self.assertContains(response, "Status 0")
+
+    def test_template_rendered_per_row(self):
+        cache.clear()
+        self.client.force_login(User.objects.get())
+        with mock.patch.object(
+            TaskListView, "get_queryset", lambda view: Task.objects.all()
+        ):
+            with self.assertRaisesMessage(
+                NPlusOneError,
+                "tasks/tasks_row.html:5 loads task.status (Task -> Status)",
+            ):
+                self.client.get(reverse("tasks:tasks_index"))
+
+    @override_settings(NPLUSONE_STRICT=False)
+    def test_warns_without_strict_mode(self):
+        source = "{% for task in tasks %}{{ task.executor.pk }}{% endfor %}"
+
+        with self.assertLogs("task_manager.nplusone", "WARNING") as logs:
+            response = self.render(source, Task.objects.all())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "loop.html:1 loads task.executor (Task -> User) 3 times",
+            logs.output[0],
+        )
+
+
+@mock.patch("task_manager.routers.replica_configured", return_value=True)
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def route(self, view, cookies=None):
+        request = self.factory.get("/")
+        request.COOKIES.update(cookies or {})
+        return ReplicaPinningMiddleware(view)(request)
+
+    def test_marked_reads_go_to_replica(self, configured):
+        def view(request):
+            self.assertEqual(Task.objects.all().db, DEFAULT_DB_ALIAS)
+            use_replica([model_namespace(Task)])
+            self.assertEqual(Task.objects.all().db, REPLICA)
+            self.assertEqual(Session.objects.all().db, DEFAULT_DB_ALIAS)
+            return HttpResponse()
+
+        response = self.route(view)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(Task.objects.all().db, DEFAULT_DB_ALIAS)
+
+    def test_write_pins_client_to_primary(self, configured):
+        def write(request):
+            use_replica([model_namespace(Task)])
+            Label.objects.create(name="New label")
+            self.assertEqual(Task.objects.all().db, DEFAULT_DB_ALIAS)
+            return HttpResponse()
+
+        def read(request):
+            use_replica([model_namespace(Task)])
+            self.assertEqual(Task.objects.all().db, DEFAULT_DB_ALIAS)
+            return HttpResponse()
+
+        cookie = self.route(write).cookies[PIN_COOKIE]
+        self.assertEqual(
+            cookie["max-age"], settings.DATABASE_REPLICA_PIN_SECONDS)
+        self.route(read, {PIN_COOKIE: cookie.value})
+
+    def test_recent_changes_are_read_from_primary(self, configured):
+        bump_version(model_namespace(Status))
+
+        def view(request):
+            use_replica([model_namespace(Status)])
+            self.assertEqual(Status.objects.all().db, DEFAULT_DB_ALIAS)
+            return HttpResponse()
+
+        def other_view(request):
+            use_replica([model_namespace(Label)])
+            self.assertEqual(Label.objects.all().db, REPLICA)
+            return HttpResponse()
+
+        self.route(view)
+        self.route(other_view)
+
+    def test_list_and_detail_views_read_replica(self, configured):
+        user = User.objects.create_user(username="testuser")
+        status = Status.objects.create(name="To Do")
+        task = Task.objects.create(
+            name="Test Task", status=status, owner=user, executor=user)
+        self.client.force_login(user)
+        cache.clear()
+
+        decisions = []
+        route_to_replica = ReplicaRouter.route_to_replica
+
+        def spy(router, model):
+            decision = route_to_replica(router, model)
+            decisions.append((model, decision))
+            return decision
+
+        # Реплика в тестах - та же база, по ней проверяется только выбор
+        with mock.patch.object(
+            ReplicaRouter, "replica", DEFAULT_DB_ALIAS
+        ), mock.patch.object(ReplicaRouter, "route_to_replica", spy):
+            for url, model in (
+                (reverse("tasks:tasks_index"), Task),
+                (reverse("tasks:tasks_detail", args=[task.id]), Task),
+                (reverse("users:user_list"), User),
+                (reverse("labels:labels_index"), Label),
+                (reverse("statuses:statuses_index"), Status),
+            ):
+                decisions.clear()
+                self.assertEqual(self.client.get(url).status_code, 200)
+                self.assertIn((model, True), decisions)
+
+            response = self.client.post(
+                reverse("statuses:statuses_create"), {"name": "New"})
+            self.assertIn(PIN_COOKIE, response.cookies)
+            decisions.clear()
+            self.client.get(reverse("statuses:statuses_index"))
+            self.assertNotIn((Status, True), decisions)
+
+
+class StubRollbarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.items.append(
+            (self.path, self.headers["X-Rollbar-Access-Token"],
+             json.loads(body)))
+        time.sleep(self.server.delay)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ErrorReportQueueTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubRollbarHandler)
+        self.server.items = []
+        self.server.delay = 0
+        self.server.status = 200
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        self.endpoint = f"http://{host}:{port}/api/1/"
+
+    def make_queue(self, **kwargs):
+        report_queue = ReportQueue(self.endpoint, batch_wait=0.01, **kwargs)
+        self.addCleanup(report_queue.stop, 5)
+        return report_queue
+
+    def test_items_are_sent_in_background(self):
+        report_queue = self.make_queue()
+        for number in range(3):
+            self.assertTrue(
+                report_queue.put({"data": {"number": number}}, "token"))
+        self.assertTrue(report_queue.flush(5))
+
+        self.assertEqual(
+            self.server.items,
+            [("/api/1/item/", "token", {"data": {"number": number}})
+             for number in range(3)],
+        )
+        self.assertEqual(report_queue.stats()["sent"], 3)
+
+    def test_batch_is_limited(self):
+        report_queue = self.make_queue(batch_size=2)
+        with mock.patch.object(report_queue, "start"):
+            for number in range(3):
+                report_queue.put({"data": {}}, "token")
+            self.assertEqual(len(report_queue.next_batch()), 2)
+            self.assertEqual(len(report_queue.next_batch()), 1)
+
+    def test_full_queue_drops_items(self):
+        report_queue = self.make_queue(maxsize=2)
+        with mock.patch.object(report_queue, "start"):
+            results = [report_queue.put({"data": {}}, "token")
+                       for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(report_queue.stats()["dropped"], 1)
+
+    def test_slow_endpoint_opens_circuit(self):
+        self.server.delay = 0.2
+        report_queue = self.make_queue(
+            slow_seconds=0.05, failures=2, cooldown=60)
+        for _ in range(5):
+            report_queue.put({"data": {}}, "token")
+        self.assertTrue(report_queue.flush(5))
+
+        self.assertEqual(len(self.server.items), 2)
+        stats = report_queue.stats()
+        self.assertEqual(stats["failed"], 2)
+        self.assertEqual(stats["dropped"], 3)
+        self.assertEqual(stats["circuit"], OPEN)
+
+    def test_server_errors_count_as_failures(self):
+        self.server.status = 503
+        report_queue = self.make_queue(failures=1, cooldown=60)
+        report_queue.put({"data": {}}, "token")
+        report_queue.put({"data": {}}, "token")
+        self.assertTrue(report_queue.flush(5))
+        self.assertEqual(len(self.server.items), 1)
+        self.assertEqual(report_queue.stats()["circuit"], OPEN)
+
+    def test_circuit_retries_after_cooldown(self):
+        now = [0]
+        breaker = CircuitBreaker(failures=1, cooldown=10, clock=lambda: now[0])
+        breaker.record(False)
+        self.assertFalse(breaker.allow())
+
+        now[0] = 10
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.record(False)
+        self.assertFalse(breaker.allow())
+
+        now[0] = 20
+        self.assertTrue(breaker.allow())
+        breaker.record(True)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_rollbar_payloads_are_queued(self):
+        payload = {"access_token": "token", "data": {"level": "error"}}
+        with mock.patch(
+            "task_manager.error_reporting.get_queue"
+        ) as get_queue, mock.patch("rollbar._send_payload") as send:
+            rollbar.send_payload(payload, "token")
+        get_queue.return_value.put.assert_called_once_with(payload, "token")
+        send.assert_not_called()
+
+
+class SeedTests(TestCase):
+    def test_label_fan_out_is_skewed(self):
+        counts = seed(
+            users=3, statuses=2, labels=10, tasks=300, labels_per_task=2,
+            random_seed=1)
+        self.assertEqual(counts["tasks"], 300)
+
+        links = Task.labels.through.objects
+        uses = [
+            links.filter(label=label).count()
+            for label in Label.objects.order_by("pk")
+        ]
+        self.assertGreater(uses[0], uses[-1] * 3)
+        per_task = links.count() / 300
+        self.assertAlmostEqual(per_task, 2, delta=0.5)
+
+
+class SeedDataCommandTests(TestCase):
+    def test_seeds_skewed_data(self):
+        out = StringIO()
+        call_command(
+            "seed_data", users=20, statuses=5, labels=4, tasks=400,
+            random_seed=1, stdout=out)
+        self.assertIn("'tasks': 400", out.getvalue())
+
+        statuses = Status.objects.order_by("-task_count")
+        self.assertEqual(sum(status.task_count for status in statuses), 400)
+        self.assertEqual(
+            statuses[0].task_count, statuses[0].tasks.count())
+        # Горячий статус и самый занятый исполнитель
+        self.assertGreater(statuses[0].task_count, 400 / 3)
+        executor_tasks = sorted(
+            (user.tasks_executed.count() for user in User.objects.all()),
+            reverse=True)
+        self.assertGreater(executor_tasks[0], executor_tasks[-1] * 3)
+        self.assertTrue(
+            User.objects.first().check_password(SEED_PASSWORD))
+
+    def test_indexes_survive_bulk_load(self):
+        call_command("seed_data", users=2, tasks=50, stdout=StringIO())
+        # Вторая загрузка меньше таблицы и идёт через обычные индексы
+        call_command("seed_data", users=2, tasks=10, stdout=StringIO())
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Task._meta.db_table)
+        self.assertIn("task_status_executor_idx", constraints)
+        self.assertEqual(
+            search_tasks(Task.objects.all(), "generated").count(), 60)
+        status = Status.objects.first()
+        user = User.objects.first()
+        task = Task.objects.create(
+            name="After seeding", status=status, owner=user, executor=user)
+        self.assertEqual(Task.objects.filter(pk__lt=task.pk).count(), 60)
+
+
+class BenchmarkViewsCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = Path(directory.name) / "results.json"
+
+    def benchmark(self, **options):
+        out = StringIO()
+        call_command(
+            "benchmark_views", repeat=2, output=str(self.output), stdout=out,
+            **options)
+        return out.getvalue()
+
+    def test_measures_every_view(self):
+        output = self.benchmark(seed_tasks=20, users=5, labels=5)
+
+        results = json.loads(self.output.read_text())["results"]
+        self.assertIn("tasks:tasks_index", output)
+        self.assertNotIn("admin:index", results)
+        for name in (
+            "index", "users:user_list", "tasks:tasks_detail",
+            "tasks_api:tasks_detail", "labels:labels_delete",
+        ):
+            self.assertEqual(results[name]["status"], 200, name)
+        tasks_index = results["tasks:tasks_index"]
+        self.assertGreater(tasks_index["queries"], 0)
+        self.assertGreater(tasks_index["memory_kib"], 0)
+        self.assertFalse(
+            User.objects.filter(username__startswith="benchmark-").exists())
+
+    def test_fails_on_regression(self):
+        self.benchmark(seed_tasks=5, users=2, labels=2)
+        baseline = Path(self.output.parent) / "baseline.json"
+        data = json.loads(self.output.read_text())
+        data["results"]["tasks:tasks_index"]["queries"] -= 1
+        baseline.write_text(json.dumps(data))
+
+        with self.assertRaisesMessage(CommandError, "tasks:tasks_index"):
+            self.benchmark(baseline=str(baseline))
+
+    def test_requires_data(self):
+        with self.assertRaises(CommandError):
+            self.benchmark()
+
+    def test_regressions_beyond_threshold(self):
+        base = {"p50_ms": 10, "memory_kib": 100, "queries": 5}
+        self.assertEqual(find_regressions(
+            {"index": {"p50_ms": 11.5, "memory_kib": 115, "queries": 5}},
+            {"index": base}, threshold=20,
+        ), [])
+        self.assertEqual(find_regressions(
+            {"index": {"p50_ms": 13, "memory_kib": 100, "queries": 6},
+             "new": base},
+            {"index": base}, threshold=20,
+        ), ["index: queries 5 -> 6", "index: p50_ms 10 -> 13"])
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    # Смоделированные пользователи работают в своих потоках, им нужны
+    # закоммиченные данные
+    def setUp(self):
+        seed(users=3, statuses=2, labels=3, tasks=10, random_seed=1)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = Path(directory.name) / "results.json"
+
+    def test_replays_every_scenario(self):
+        out = StringIO()
+        call_command(
+            "load_test", users=2, duration=0, requests=30, random_seed=1,
+            output=str(self.output), stdout=out,
+        )
+
+        data = json.loads(self.output.read_text())
+        results = data["results"]
+        for name in (
+            "POST login", "GET tasks:tasks_index", "GET tasks:tasks_detail",
+            "POST tasks:tasks_create", "POST tasks:tasks_update",
+            "POST tasks:tasks_delete",
+        ):
+            self.assertGreater(results[name]["requests"], 0, name)
+        self.assertEqual(data["total"]["errors"], 0)
+        self.assertGreater(data["total"]["rps"], 0)
+        self.assertIn("p99", out.getvalue())
+        self.assertFalse(
+            User.objects.filter(username__startswith="load-").exists())
+        self.assertEqual(Task.objects.count(), 10)
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix("list=3, detail=1"), {"list": 3, "detail": 1})
+        for value in ("list=3,search=1", "list=x", "list=0"):
+            with self.assertRaises(ValueError):
+                parse_mix(value)
+        self.assertEqual(
+            set(parse_mix(",".join(f"{name}=1" for name in DEFAULT_MIX))),
+            set(DEFAULT_MIX))
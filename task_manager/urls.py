@@ -23,6 +23,7 @@ from .views import CustomLoginView, CustomLogoutView
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.IndexView.as_view(), name='index'),
+    path('health/', views.HealthView.as_view(), name='health'),
     path(
         'users/',
         include(('task_manager.users.urls', 'users'), namespace='users')
@@ -38,6 +39,12 @@ urlpatterns = [
         'tasks/',
         include(('task_manager.tasks.urls', 'tasks'), namespace='tasks')
     ),
+    path(
+        'api/tasks/',
+        include(
+            ('task_manager.tasks.api_urls', 'tasks_api'),
+            namespace='tasks_api')
+    ),
     path(
         'labels/',
         include(('task_manager.labels.urls', 'labels'), namespace='labels')
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import DEFAULT_DB_ALIAS
+from django.views.decorators.debug import sensitive_variables
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+def user_cache_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def primary_users():
+    return UserModel._default_manager.db_manager(DEFAULT_DB_ALIAS)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that keeps the user of a session in the cache.
+
+    AuthenticationMiddleware loads the user on every request; with this
+    backend only the first request after a change reads the users table.
+    The entry is dropped when the user is saved or deleted (see
+    users.signals), and the session hash is still checked by Django on
+    every request, so a password change logs other sessions out as usual.
+    Other workers only see that through a shared cache: without one
+    USER_CACHE_TIMEOUT is 0 and the user is read on every request.
+
+    The async methods check passwords in the hashing pool (see
+    users.hashing) instead of the event loop.
+
+    Wrong credentials raise PermissionDenied, which stops authenticate():
+    ModelBackend after this backend only loads the users of sessions it
+    logged in, it shouldn't hash the same wrong password once more.
+
+    The user is always read from the primary database: a replica may
+    still hold the old password hash, and the cache would keep it.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key) if settings.USER_CACHE_TIMEOUT else None
+        if user is None:
+            try:
+                user = primary_users().get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if not self.user_can_authenticate(user):
+                return None
+            if settings.USER_CACHE_TIMEOUT:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+    async def aget_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = await cache.aget(key) if settings.USER_CACHE_TIMEOUT else None
+        if user is None:
+            try:
+                user = await primary_users().aget(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if not self.user_can_authenticate(user):
+                return None
+            if settings.USER_CACHE_TIMEOUT:
+                await cache.aset(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+    @sensitive_variables("password")
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username, password, **kwargs)
+        if user is None and password is not None:
+            raise PermissionDenied
+        return user
+
+    @sensitive_variables("password")
+    async def aauthenticate(
+        self, request, username=None, password=None, **kwargs
+    ):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(
+                username)
+        except UserModel.DoesNotExist:
+            # Хеш считается и для несуществующего пользователя, иначе его
+            # отсутствие видно по времени ответа
+            await hashing.amake_password(password)
+            raise PermissionDenied
+        if await hashing.acheck_password(user, password) and (
+            self.user_can_authenticate(user)
+        ):
+            return user
+        raise PermissionDenied
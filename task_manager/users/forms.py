@@ -3,6 +3,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
+from .hashing import amake_password
 from .models import User
 
 
@@ -69,3 +70,10 @@ class CustomUserCreationForm(UserCreationForm):
         if password1 != password2:
             raise ValidationError(_("Passwords didn't match."))
         return password2
+
+    async def asave(self):
+        """save() that hashes the password in the hashing pool."""
+        user = self.instance
+        user.password = await amake_password(self.cleaned_data["password1"])
+        await user.asave()
+        return user
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the pool that runs password hashing, or None to hash inline.
+
+    hashlib releases the GIL while it computes PBKDF2, so threads hash in
+    parallel; the pool size caps how many cores a burst of logins takes.
+    """
+    global _executor
+    if settings.PASSWORD_HASHING_WORKERS < 1:
+        return None
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix="password-hashing",
+            )
+    return _executor
+
+
+def reset_executor():
+    """Shut the pool down; the next call creates one with new settings."""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+async def run(func, *args, **kwargs):
+    executor = get_executor()
+    if executor is None:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def amake_password(password):
+    return await run(make_password, password)
+
+
+async def acheck_password(user, password):
+    """
+    Async ``user.check_password()`` that hashes in the pool.
+
+    Like the sync version, it stores a new hash when the hasher settings
+    have changed since the password was set.
+    """
+    is_correct, must_update = await run(
+        verify_password, password, user.password)
+    if is_correct and must_update:
+        user.password = await amake_password(password)
+        await user.asave(update_fields=["password"])
+    return is_correct
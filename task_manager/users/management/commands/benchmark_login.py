@@ -0,0 +1,122 @@
+import asyncio
+import os
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+
+from task_manager.benchmarks import (
+    benchmark_user,
+    percentile,
+    testserver_settings,
+)
+from task_manager.users import hashing
+
+PASSWORD = "benchmark-password"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput of the async login view. Logins are "
+        "posted concurrently through the ASGI handler while a probe "
+        "measures how long the event loop stays blocked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--workers", type=int,
+            help="Hashing pool size, PASSWORD_HASHING_WORKERS by default. "
+                 "0 hashes in the event loop, for comparison.",
+        )
+
+    def handle(self, *args, **options):
+        if options["logins"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--logins and --concurrency must be positive.")
+
+        overrides = {}
+        if options["workers"] is not None:
+            overrides["PASSWORD_HASHING_WORKERS"] = options["workers"]
+        hashing.reset_executor()
+        try:
+            with (
+                benchmark_user(password=PASSWORD) as user,
+                testserver_settings(**overrides),
+            ):
+                result = async_to_sync(self.run)(user, options)
+        finally:
+            hashing.reset_executor()
+        self.report(result)
+
+    async def run(self, user, options):
+        url = reverse("login")
+        data = {"username": user.username, "password": PASSWORD}
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies = []
+
+        async def login():
+            async with semaphore:
+                # Новый клиент на каждый вход: вошедшего пользователя
+                # LoginView перенаправляет, не проверяя пароль
+                start = time.perf_counter()
+                response = await AsyncClient().post(url, data)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 302:
+                    raise CommandError(
+                        f"Login failed with status {response.status_code}.")
+
+        stalls = []
+        done = asyncio.Event()
+
+        async def probe(interval=0.005):
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                stalls.append(time.perf_counter() - start - interval)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(login() for _ in range(options["logins"])))
+        finally:
+            elapsed = time.perf_counter() - start
+            done.set()
+            await probe_task
+
+        return {
+            "logins": options["logins"],
+            "concurrency": options["concurrency"],
+            "workers": settings.PASSWORD_HASHING_WORKERS,
+            "elapsed": elapsed,
+            "latencies": latencies,
+            "stalls": stalls,
+        }
+
+    def report(self, result):
+        latencies = sorted(result["latencies"])
+        throughput = result["logins"] / result["elapsed"]
+        # Хеширование упирается в процессор: пропускная способность на ядро
+        # считается по числу ядер, которые пул может занять
+        cores = min(max(result["workers"], 1), os.cpu_count() or 1)
+        self.stdout.write(
+            f"Logins: {result['logins']}, concurrency: "
+            f"{result['concurrency']}, hashing workers: {result['workers']}, "
+            f"cores used: {cores}"
+        )
+        self.stdout.write(
+            f"Throughput: {throughput:.1f} logins/s, "
+            f"{throughput / cores:.1f} logins/s per core"
+        )
+        self.stdout.write(
+            f"Latency: p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+            f"p99 {percentile(latencies, 99) * 1000:.1f} ms"
+        )
+        self.stdout.write(
+            "Longest event loop stall: "
+            f"{max(result['stalls'], default=0) * 1000:.1f} ms"
+        )
+
@@ -4,6 +4,7 @@ from django.contrib.auth.models import (
     PermissionsMixin,
 )
 from django.db import models
+from django.db.models import F, Func, IntegerField, OuterRef, Q, Subquery
 from django.utils.translation import gettext_lazy as _
 
 
@@ -22,6 +23,24 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(username, password, **extra_fields)
 
+    def with_task_count(self):
+        """Annotate ``task_count``: tasks the user owns or executes."""
+        tasks = (
+            _related_tasks(OuterRef("pk"))
+            .order_by()
+            .annotate(count=Func(F("pk"), function="COUNT"))
+            .values("count")
+        )
+        return self.get_queryset().annotate(
+            task_count=Subquery(tasks, output_field=IntegerField())
+        )
+
+
+def _related_tasks(user):
+    # Task ссылается на User, поэтому модель берётся через обратную связь
+    Task = User.tasks_owned.field.model
+    return Task.objects.filter(Q(owner=user) | Q(executor=user))
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     first_name = models.CharField(max_length=255, verbose_name=_("First Name"))
@@ -60,7 +79,7 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
     def delete(self, *args, **kwargs):
-        protected_tasks = self.tasks_owned.all() | self.tasks_executed.all()
+        protected_tasks = _related_tasks(self)
 
         if protected_tasks.exists():
             raise models.ProtectedError(
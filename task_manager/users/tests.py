@@ -1,6 +1,25 @@
-from django.contrib.auth import get_user_model
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+from task_manager.seeding import seed
+from task_manager.statuses.models import Status
+from task_manager.tasks.models import Task
+from task_manager.testing import QueryBudgetTestMixin
+
+from . import hashing
 
 User = get_user_model()
 
@@ -208,3 +227,210 @@ class UserCRUDTestCase(TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "слишком короткий")
+
+    def test_user_list_shows_usage(self):
+        status = Status.objects.create(name="In Progress")
+        Task.objects.create(
+            name="Own task",
+            description="Task description",
+            status=status,
+            owner=self.user,
+            executor=self.user,
+        )
+        Task.objects.create(
+            name="Executed task",
+            description="Task description",
+            status=status,
+            owner=self.second_user,
+            executor=self.user,
+        )
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.users_url)
+        self.assertContains(response, "Используется (2 задачи)")
+        self.assertContains(response, "Используется (1 задача)")
+        self.assertNotContains(response, self.delete_url)
+
+        for number in range(5):
+            User.objects.create_user(username=f"user{number}")
+        with CaptureQueriesContext(connection) as more_rows:
+            self.client.get(self.users_url)
+        self.assertEqual(len(more_rows), len(context))
+
+
+class AsyncAuthViewsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            first_name="test",
+            last_name="test",
+            username="TestUser",
+            password="password123",
+        )
+        self.login_url = reverse("login")
+        self.pool = mock.patch.object(hashing, "run", wraps=hashing.run)
+
+    def hashed_with(self, run):
+        return [call.args[0] for call in run.call_args_list]
+
+    def test_login_hashes_in_pool(self):
+        with self.pool as run:
+            response = self.client.post(self.login_url, {
+                "username": "TestUser", "password": "password123"})
+        self.assertRedirects(response, reverse("index"))
+        self.assertEqual(self.hashed_with(run), [verify_password])
+
+        response = self.client.get(reverse("tasks:tasks_index"))
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.login_url)
+        self.assertRedirects(response, reverse("index"))
+
+    def test_head_and_options(self):
+        for url in (self.login_url, reverse("users:user_create")):
+            self.assertEqual(self.client.head(url).status_code, 200, url)
+            response = self.client.options(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertIn("HEAD", response["Allow"])
+
+    def test_login_with_wrong_password(self):
+        # ModelBackend для старых сессий пароль второй раз не проверяет
+        model_backend = mock.patch.object(ModelBackend, "aauthenticate")
+        for username in ("TestUser", "Nobody"):
+            with model_backend as aauthenticate:
+                response = self.client.post(self.login_url, {
+                    "username": username, "password": "wrong"})
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "Неправильное имя пользователя")
+            aauthenticate.assert_not_called()
+        self.assertNotIn("_auth_user_id", self.client.session)
+
+    def test_registration_hashes_in_pool(self):
+        with self.pool as run:
+            response = self.client.post(reverse("users:user_create"), {
+                "first_name": "New",
+                "last_name": "User",
+                "username": "NewUser",
+                "password1": "x7Kp-q2zR",
+                "password2": "x7Kp-q2zR",
+            })
+        self.assertRedirects(response, self.login_url)
+        self.assertEqual(self.hashed_with(run), [make_password])
+        self.assertTrue(
+            User.objects.get(username="NewUser").check_password("x7Kp-q2zR"))
+
+
+class BenchmarkLoginCommandTests(TestCase):
+    def test_reports_throughput(self):
+        out = StringIO()
+        call_command(
+            "benchmark_login", logins=3, concurrency=2, workers=2, stdout=out)
+        output = out.getvalue()
+
+        self.assertIn("hashing workers: 2", output)
+        self.assertIn("logins/s per core", output)
+        self.assertIn("p99", output)
+        self.assertFalse(
+            User.objects.filter(username__startswith="benchmark-").exists())
+
+
+@override_settings(USER_CACHE_TIMEOUT=300)
+class CachedUserTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            first_name="test",
+            last_name="test",
+            username="TestUser",
+            password="password123",
+        )
+        self.client.login(username="TestUser", password="password123")
+        self.index_url = reverse("index")
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.index_url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            query["sql"] for query in context.captured_queries
+            if '"users_user"' in query["sql"]
+        ]
+
+    def test_user_is_loaded_once(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+        self.user.first_name = "changed"
+        self.user.save()
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(self.user_queries(), [])
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_user_is_loaded_every_time_without_cache(self):
+        self.assertEqual(len(self.user_queries()), 1)
+        self.assertEqual(len(self.user_queries()), 1)
+
+    def test_password_change_logs_out(self):
+        self.user_queries()
+        self.user.set_password("new-password")
+        self.user.save()
+
+        response = self.client.get(reverse("tasks:tasks_index"))
+        self.assertRedirects(response, reverse("login"))
+
+    def test_wrong_password_is_checked_once(self):
+        with mock.patch(
+            "django.contrib.auth.hashers.verify_password",
+            wraps=verify_password,
+        ) as verify:
+            user = authenticate(username="TestUser", password="wrong")
+
+        self.assertIsNone(user)
+        verify.assert_called_once()
+
+    def test_sessions_of_model_backend_stay_logged_in(self):
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend")
+
+        response = self.client.get(reverse("tasks:tasks_index"))
+
+        self.assertEqual(response.status_code, 200)
+
+
+class PurgeSessionsCommandTests(TestCase):
+    def test_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(
+                session_key=f"expired{number}",
+                session_data="",
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key="active",
+            session_data="",
+            expire_date=now + timedelta(days=1),
+        )
+
+        out = StringIO()
+        call_command("purge_sessions", batch_size=2, max_batches=2, stdout=out)
+        self.assertEqual(Session.objects.count(), 2)
+        self.assertIn("Done: 4", out.getvalue())
+
+        call_command("purge_sessions", batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            list(Session.objects.values_list("session_key", flat=True)),
+            ["active"],
+        )
+
+
+class UserQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def test_user_list(self):
+        # С входом бюджет включает ещё сессию и пользователя
+        self.client.force_login(User.objects.create_user(username="viewer"))
+
+        def populate(size):
+            # У пользователей есть задачи: список показывает их число
+            seed(users=max(size - User.objects.count(), 1), statuses=1,
+                 labels=0, tasks=size, random_seed=size)
+
+        self.assertQueryBudget(reverse("users:user_list"), populate)
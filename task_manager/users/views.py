@@ -1,11 +1,13 @@
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.db.models import ProtectedError
+from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import CreateView, DeleteView, ListView, UpdateView
 
-from task_manager.mixins import CustomLoginRequiredMixin
+from task_manager.mixins import CustomLoginRequiredMixin, ReplicaReadMixin
 
 from .forms import CustomUserCreationForm
 from .models import User
@@ -13,10 +15,16 @@ from .models import User
 SUCCESS_URL = 'users:user_list'
 
 
-class UserListView(ListView):
+class UserListView(ReplicaReadMixin, ListView):
     model = User
+    replica_models = (User,)
     template_name = 'users/user_list.html'
     context_object_name = 'users'
+    max_queries = 3
+
+    def get_queryset(self):
+        # Число задач считается в том же запросе, что и список
+        return User.objects.with_task_count()
 
 
 class UserCreateView(CreateView):
@@ -26,11 +34,22 @@ class UserCreateView(CreateView):
     message_success = _("The user has been successfully registered")
     form_title = _("Register User")
     form_submit = _("Register")
-
-    def form_valid(self, form):
-        response = super().form_valid(form)
-        messages.success(self.request, self.message_success)
-        return response
+    http_method_names = ["get", "post", "head", "options"]
+
+    # Регистрация асинхронная, чтобы хеширование пароля шло в пуле потоков
+    async def get(self, request, *args, **kwargs):
+        self.object = None
+        return self.render_to_response(self.get_context_data())
+
+    async def post(self, request, *args, **kwargs):
+        self.object = None
+        form = self.get_form()
+        # Проверка уникальности имени обращается к базе
+        if not await sync_to_async(form.is_valid)():
+            return self.form_invalid(form)
+        self.object = await form.asave()
+        messages.success(request, self.message_success)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class UserUpdateView(CustomLoginRequiredMixin, UpdateView):
@@ -1,14 +1,34 @@
 from django.contrib import messages
+from django.contrib.auth import alogin
 from django.contrib.auth.views import LoginView, LogoutView
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+from django.http import HttpResponseRedirect, JsonResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
-from django.views.generic import TemplateView
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.debug import sensitive_post_parameters
+from django.views.generic import TemplateView, View
 
+from .db import check_database, pool_stats
+from .error_reporting import get_queue
 from .forms import UserLoginForm
+from .routers import REPLICA, replica_configured
 
 
+@method_decorator(
+    [sensitive_post_parameters(), csrf_protect, never_cache], name="dispatch"
+)
 class CustomLoginView(LoginView):
+    """
+    Async login: under ASGI the password is checked in the hashing pool
+    while the worker keeps serving other requests.
+    """
     authentication_form = UserLoginForm
+    # put из ProcessFormView синхронный, а смешивать синхронные и
+    # асинхронные обработчики View не даёт
+    http_method_names = ["get", "post", "head", "options"]
     success_message = _("You are logged in")
     success_url = reverse_lazy("index")
     redirect_authenticated_user = True
@@ -20,9 +40,24 @@ class CustomLoginView(LoginView):
     form_title = _("Login")
     form_submit = _("Log in")
 
-    def form_valid(self, form):
-        messages.success(self.request, self.success_message)
-        return super().form_valid(form)
+    async def dispatch(self, request, *args, **kwargs):
+        # То же, что LoginView.dispatch, но пользователь берётся через
+        # auser(): синхронный request.user в async-коде недоступен
+        user = await request.auser()
+        if self.redirect_authenticated_user and user.is_authenticated:
+            return HttpResponseRedirect(self.get_success_url())
+        return await super(LoginView, self).dispatch(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        return self.render_to_response(self.get_context_data())
+
+    async def post(self, request, *args, **kwargs):
+        form = self.get_form()
+        if not await form.ais_valid():
+            return self.form_invalid(form)
+        await alogin(request, form.get_user())
+        messages.success(request, self.success_message)
+        return HttpResponseRedirect(self.get_success_url())
 
 
 class CustomLogoutView(LogoutView):
@@ -35,3 +70,28 @@ class CustomLogoutView(LogoutView):
 
 class IndexView(TemplateView):
     template_name = "index.html"
+
+
+@method_decorator(never_cache, name="dispatch")
+class HealthView(View):
+    """
+    Database availability, connection pool usage and the error report queue
+    of this worker.
+    """
+
+    def get(self, request, *args, **kwargs):
+        data = self.check(DEFAULT_DB_ALIAS)
+        healthy = data["database"] == "ok"
+        if replica_configured():
+            data["replica"] = self.check(REPLICA)
+            healthy = healthy and data["replica"]["database"] == "ok"
+        # Rollbar недоступен - это не повод выводить воркер из балансировки
+        data["error_reports"] = get_queue().stats()
+        return JsonResponse(data, status=200 if healthy else 503)
+
+    def check(self, alias):
+        try:
+            check_database(alias)
+        except DatabaseError:
+            return {"database": "unavailable"}
+        return {"database": "ok", "pool": pool_stats(alias)}